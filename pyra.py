@@ -1,182 +1,17 @@
 #! /usr/bin/env python3
 __author__ = 'ben'
 
-import subprocess, os, difflib, shlex, argparse
+import time
 
-from lib.termcolor import colored
-from lib.colorama import init
+# Taken before anything else is imported, for --startup-time
+STARTED = time.perf_counter()
 
-init()
-
-class TestRunner(object):
-
-    # Default values for settings
-    DEFAULTS = {
-        'resultsDir': 'testres/',
-        'assetsDir': 'assets/',
-        'execDir': '.',
-        'timeout': 2,
-        'details': False,
-        'fullPath': False
-    }
-
-    # Types of output from the script
-    OUTPUTS = ['out', 'err']
-
-    def _log(self, message, show = True):
-        if show:
-            print(message)
-
-    def _printDetail(self, message):
-        self._log(message, show = self._config['details'])
-
-    def _printNoDetail(self, message):
-        self._log(message, show = not self._config['details'])
-
-
-    def __init__(self, tests, config=None):
-        # Fill configuration options in with defaults
-        self._config = dict(self.DEFAULTS, **(config or {}))
-
-        # Parse tests
-        self._parse_tests(tests)
-
-    def _parse_tests(self, tests):
-        res = []
-
-        for testLine in tests.split('\n'):
-            testLine = testLine.strip()
-
-            if not testLine or testLine.startswith('#'):
-                continue
-
-            test = testLine.split('|')
-
-            test = {
-                'exec': test[0],
-                'code': int(test[1]),
-                'in': test[2],
-                'out': test[3],
-                'err': test[4],
-                'args': test[7],
-                'name': test[8],
-                'raw': testLine
-            }
-
-            res.append(test)
-
-        self._tests = res
-
-    def _color_diff(self, diff):
-        colours = {
-            '+': 'cyan',
-            '-': 'red',
-            '?': 'yellow',
-            ' ': 'white',
-            '@': 'yellow'
-        }
-
-        defaultColour = 'white'
-
-        return [colored(line, colours.get(line[0], defaultColour)) for line in diff]
-
-
-    def run_tests(self, indices=None):
-        res = []
-
-        if not os.path.exists(self._config['resultsDir']):
-            os.makedirs(self._config['resultsDir'])
-
-        tests = [(i + 1, test) for i, test in enumerate(self._tests) if indices is None or i + 1 in indices]
-
-        cmdColour = 'white'
-
-        for i, test in tests:
-            opts = test.copy()
-
-            testNum = i
-
-            opts['exec'] = os.path.join(self._config['execDir'], opts['exec'])
-            opts['actual_out'] = os.path.join(self._config['resultsDir'], 'test.{}.out'.format(testNum))
-            opts['actual_err'] = os.path.join(self._config['resultsDir'], 'test.{}.err'.format(testNum))
-            opts['supplied_in'] = os.path.join(self._config['assetsDir'], opts['in'])
-            opts['expected_out'] = os.path.join(self._config['assetsDir'], opts['out'])
-            opts['expected_err'] = os.path.join(self._config['assetsDir'], opts['err'])
-
-            for key in ['exec', 'actual_out', 'actual_err', 'supplied_in', 'expected_out', 'expected_err']:
-                opts[key] = os.path.normpath(opts[key])
-                opts[key] = opts[key].replace(self._config['execDir'], '.')
-                opts[key + '_sh'] = opts[key] if config['fullPath'] else shlex.quote(opts[key])
-
-            cmd = '{exec_sh} {args} < {supplied_in_sh} 1> {actual_out_sh} 2> {actual_err_sh}'.format(**opts)
-
-            self._printDetail("Test {}: \n\t{}".format(testNum, colored(cmd, cmdColour)))
-
-            success = True
-            timedOut = False
-
-            proc = subprocess.Popen(cmd, shell = True)
-            try:
-                proc.communicate(timeout=self._config['timeout'])
-                code = proc.returncode
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                timedOut = True
-                self._log("Execution timed out after {} seconds...".format(self._config['timeout']))
-                success = False
-
-            if success:
-                # Check code
-                if code != opts['code']:
-                    self._printDetail("Failed with wrong exit code; got {} but expecting {}".format(code, opts['code']))
-                    success = False
-
-                # Check stdout & stderr
-                for output in self.OUTPUTS:
-
-                    expectedFile = opts['expected_' + output]
-                    actualFile = opts['actual_' + output]
-
-                    data = {
-                        'expected': opts['expected_' + output + '_sh'],
-                        'actual': opts['actual_' + output + '_sh']
-                    }
-
-                    diffCmd = "diff {expected} {actual}".format(**data)
-
-                    with open(expectedFile, 'rU') as fd:
-                        expected = fd.readlines()
-
-                    with open(actualFile, 'rU') as fd:
-                        actual = fd.readlines()
-
-                    diff = difflib.unified_diff(expected, actual, fromfile = '{} (expected)'.format(expectedFile), tofile = '{} (actual)'.format(actualFile))
-                    diff = list(diff)
-
-                    if bool(len(diff)):
-                        self._printDetail("{} differs:\n\t{}".format(output, colored(diffCmd, cmdColour)))
-                        self._printDetail('-' * 80)
-                        self._printDetail("".join(self._color_diff(diff)))
-                        success = False
-                        self._printDetail('-' * 80)
-
-            res.append(success)
-
-            outcome = colored("PASSED", 'green') if success else colored("FAILED", 'red')
-
-            self._printDetail(outcome)
-
-            self._printNoDetail(colored("Test {} {}".format(testNum, outcome), 'green' if success else 'red'))
-
-            if not success:
-                self._printDetail(colored(test['raw'], 'yellow'))
-
-            self._printDetail("=" * 80)
-
-        self._log("Passed {}/{} tests!".format(sum(res), len(tests)))
+# The runner lives in pyralib, which Python keeps compiled between runs; this script holds the tests
 
 TESTS = """
-# exec|retval|input|expected_output|expected_err|||args
+# exec|retval|input|expected_output|expected_err|comparator|timeout|args|name
+# comparator: exact, text (default), trailing, regex or unordered, for both outputs or as e.g. err:unordered
+# timeout: seconds, overriding -t and adaptive timeouts for this test
 
 #Argument number
 ./player|1|empty|dash|incorrect_args.out||||Incorrect args 0
@@ -326,24 +161,6 @@ TESTS = """
 
 """
 
-
-
 if __name__ == '__main__':
-    config = {
-        'execDir': os.path.normpath(os.getcwd()),
-        'resultsDir': os.path.normpath(os.path.join(os.getcwd(), './testres')),
-        'assetsDir': os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets/'))
-    }
-
-    parser = argparse.ArgumentParser("Run tests.")
-    parser.add_argument('-d', dest='details', action='store_const', default=False, const=True, help='Show detailed output for each test.')
-    parser.add_argument('-t', dest='timeout', default=5, help='Set the time limit, in seconds, for each test to run.')
-    parser.add_argument('--full-path', dest='fullPath', action='store_const', default=False, const=True, help='Use the full path for all files.')
-    parser.add_argument('tests', type=int, nargs='?', default=None, help="The specific test to run.")
-
-    args = vars(parser.parse_args())
-    config.update(args)
-
-    indices = None if config['tests'] is None else [config['tests']]
-
-    TestRunner(TESTS, config).run_tests(indices=indices)
+    import pyralib
+    pyralib.main(TESTS, started=STARTED)
@@ -0,0 +1,328 @@
+#! /usr/bin/env python3
+
+# A reference player for hub tests, load tests and tournaments. It speaks the same protocol as ./player and answers
+# each yourturn with a determinized Monte Carlo search: it deals the cards it can't see at random, consistently with
+# everything that's been played, and plays out the rest of the round from each of its moves.
+#
+#   ./pyra/pyra_player.py number_of_players myid
+#
+# PYRA_PLAYER_BUDGET sets the time per move in milliseconds (default 5), and PYRA_PLAYER_SEED makes games repeatable.
+
+import sys
+
+# The hub waits for this before anything else, so it goes out before the rest is imported
+sys.stdout.write('-')
+sys.stdout.flush()
+
+import os, random, time, math
+
+# How many of each card, Guard (1) to Princess (8), are in the deck
+COUNTS = [0, 5, 2, 2, 2, 2, 1, 1, 1]
+
+# Cards played at another player
+TARGETED = (1, 2, 3, 5, 6)
+
+LETTERS = 'ABCD'
+
+# Results of earlier searches, by everything the player knows, so positions seen again start from them
+CACHE_LIMIT = 100000
+
+def _fail(message, code):
+    sys.stderr.write(message + '\n')
+    sys.exit(code)
+
+def _card(text):
+    if len(text) != 1 or text not in '12345678':
+        raise ValueError(text)
+    return int(text)
+
+def _playout(me, players, hands, deck, alive, protected, spent, move, rng):
+    # Plays out the round after move, with every player choosing at random among sensible moves;
+    # returns the share of the win that goes to me
+    random, randint, choice = rng.random, rng.randint, rng.choice
+    p = me
+
+    while True:
+        card, target, guess = move
+
+        spent[p] += card
+        protected[p] = card == 4
+
+        if card == 8:
+            alive[p] = False
+        elif target is None or card == 2:
+            pass
+        elif card == 1:
+            if hands[target] == guess:
+                alive[target] = False
+        elif card == 3:
+            if hands[p] < hands[target]:
+                alive[p] = False
+            elif hands[target] < hands[p]:
+                alive[target] = False
+        elif card == 5:
+            spent[target] += hands[target]
+            if hands[target] == 8:
+                alive[target] = False
+            else:
+                # The last draw is the card set aside at the start of the round
+                hands[target] = deck.pop() if deck else hands[target]
+        elif card == 6:
+            hands[p], hands[target] = hands[target], hands[p]
+
+        # The round ends with one player left, or when the only card left is the one set aside
+        if alive.count(True) == 1 or len(deck) <= 1:
+            break
+
+        p = (p + 1) % players
+        while not alive[p]:
+            p = (p + 1) % players
+
+        protected[p] = False
+        held, drawn = hands[p], deck.pop()
+
+        if 7 in (held, drawn) and (5 in (held, drawn) or 6 in (held, drawn)):
+            card = 7
+        elif held == 8 or drawn == 8:
+            card = drawn if held == 8 else held
+        else:
+            card = held if random() < 0.5 else drawn
+        hands[p] = drawn if card == held else held
+
+        target = guess = None
+        if card in TARGETED:
+            targets = [q for q in range(players) if q != p and alive[q] and not protected[q]]
+            if targets:
+                target = choice(targets)
+            elif card == 5:
+                target = p
+            if card == 1 and target is not None:
+                guess = randint(2, 8)
+
+        move = card, target, guess
+
+    winners = [q for q in range(players) if alive[q]]
+    if len(winners) > 1:
+        # Highest card wins, then the most spent
+        best = max((hands[q], spent[q]) for q in winners)
+        winners = [q for q in winners if (hands[q], spent[q]) == best]
+
+    return 1.0 / len(winners) if me in winners else 0.0
+
+class Player(object):
+
+    def __init__(self, players, me, budget, rng):
+        self.players = players
+        self.me = me
+        self.budget = budget
+        self.rng = rng
+        self.cache = {}
+
+    def new_round(self, card):
+        self.hand = [card]
+        self.discards = [[] for _ in range(self.players)]
+        self.alive = [True] * self.players
+        self.protected = [False] * self.players
+
+        # Cards known to be in other players' hands, after trading or tying with them
+        self.known = [None] * self.players
+        self.replaced = None
+
+    def replace(self, card):
+        # A King or Prince changed the card in hand, which may be reported before or after what happened
+        self.replaced = self.hand[0] if self.hand else None
+        self.hand = [card]
+
+    def happened(self, player, card, target, guess, discarder, discarded, out):
+        me = self.me
+
+        self.discards[player].append(card)
+        self.protected[player] = card == 4
+        if self.known[player] == card:
+            self.known[player] = None
+
+        if card == 8:
+            self.alive[player] = False
+        elif card == 6 and target is not None:
+            # Whoever traded with this player knows what they now hold
+            mine = self.replaced if self.replaced is not None else (self.hand[0] if self.hand else None)
+            if player == me:
+                self.known[target] = self.kept
+            elif target == me:
+                self.known[player] = mine
+            else:
+                self.known[player], self.known[target] = self.known[target], self.known[player]
+        elif card == 3 and player == me and target is not None and out is None and self.hand:
+            # A tie
+            self.known[target] = self.hand[0]
+
+        if discarder is not None and discarded is not None:
+            self.discards[discarder].append(discarded)
+            self.known[discarder] = None
+            if discarder == me and self.replaced is None and discarded in self.hand:
+                self.hand.remove(discarded)
+
+        if out is not None:
+            self.alive[out] = False
+            self.known[out] = None
+
+        self.replaced = None
+
+    def _unseen(self):
+        counts = COUNTS[:]
+        for cards in [self.hand] + self.discards + [[card] for card in self.known if card is not None]:
+            for card in cards:
+                counts[card] -= 1
+        return [max(count, 0) for count in counts]
+
+    def _moves(self):
+        me = self.me
+        hand = set(self.hand)
+
+        # The Countess has to go with the King or a Prince, and the Princess never does
+        if 7 in hand and (5 in hand or 6 in hand):
+            hand = {7}
+        if len(hand) > 1:
+            hand.discard(8)
+
+        unseen = self._unseen()
+        targets = [q for q in range(self.players) if q != me and self.alive[q] and not self.protected[q]]
+        moves = []
+
+        for card in sorted(hand):
+            if card not in TARGETED:
+                moves.append((card, None, None))
+            elif card == 5:
+                moves.extend((card, target, None) for target in targets + [me])
+            elif not targets:
+                moves.append((card, None, None))
+            elif card == 1:
+                for target in targets:
+                    guesses = [self.known[target]] if (self.known[target] or 1) > 1 else [guess for guess in range(2, 9) if unseen[guess]]
+                    moves.extend((card, target, guess) for guess in guesses or [2])
+            else:
+                moves.extend((card, target, None) for target in targets)
+
+        return moves
+
+    def _deal(self, unseen):
+        # One arrangement of the cards this player can't see: everyone else's hands, then the deck,
+        # whose first card is the one set aside
+        cards = [card for card in range(1, 9) for _ in range(unseen[card])]
+        self.rng.shuffle(cards)
+
+        hands = [None] * self.players
+        for q in range(self.players):
+            if q != self.me and self.alive[q]:
+                hands[q] = self.known[q] or (cards.pop() if cards else 1)
+
+        return hands, cards
+
+    def choose(self):
+        moves = self._moves()
+        if len(moves) == 1:
+            return moves[0]
+
+        key = (tuple(sorted(self.hand)), tuple(tuple(sorted(cards)) for cards in self.discards), tuple(self.alive),
+               tuple(self.protected), tuple(self.known))
+        stats = self.cache.get(key)
+        if stats is None:
+            if len(self.cache) >= CACHE_LIMIT:
+                self.cache.clear()
+            stats = self.cache[key] = dict((move, [0.0, 0]) for move in moves)
+
+        me, players, rng = self.me, self.players, self.rng
+        spent = [sum(cards) for cards in self.discards]
+        unseen = self._unseen()
+        deadline = time.perf_counter() + self.budget
+
+        while True:
+            visits = sum(visit for _, visit in stats.values())
+
+            # UCB1 over the moves, trying each once first
+            best, bestValue = None, -1
+            for move, (score, visit) in stats.items():
+                value = float('inf') if not visit else score / visit + math.sqrt(2 * math.log(visits) / visit)
+                if value > bestValue:
+                    best, bestValue = move, value
+
+            hands, deck = self._deal(unseen)
+            hand = list(self.hand)
+            hand.remove(best[0])
+            hands[me] = hand[0]
+
+            score = _playout(me, players, hands, deck, self.alive[:], self.protected[:], spent[:], best, rng)
+            stats[best][0] += score
+            stats[best][1] += 1
+
+            if time.perf_counter() >= deadline:
+                break
+
+        return max(stats, key=lambda move: (stats[move][1], stats[move][0]))
+
+    def your_turn(self, card):
+        self.hand.append(card)
+        self.protected[self.me] = False
+
+        move = self.choose()
+        card, target, guess = move
+
+        self.hand.remove(card)
+        self.kept = self.hand[0] if self.hand else None
+
+        return '{}{}{}'.format(card, '-' if target is None else LETTERS[target], '-' if guess is None else guess)
+
+def main(argv):
+    if len(argv) != 2:
+        _fail("Usage: player number_of_players myid", 1)
+
+    try:
+        players = int(argv[0])
+    except ValueError:
+        players = 0
+    if str(players) != argv[0] or not 2 <= players <= 4:
+        _fail("Invalid player count", 2)
+
+    if len(argv[1]) != 1 or argv[1] not in LETTERS[:players]:
+        _fail("Invalid player ID", 3)
+
+    seed = os.environ.get('PYRA_PLAYER_SEED')
+    budget = float(os.environ.get('PYRA_PLAYER_BUDGET') or 5) / 1000
+    player = Player(players, LETTERS.index(argv[1]), budget, random.Random(seed))
+
+    ids = dict((letter, index) for index, letter in enumerate(LETTERS[:players]))
+    ids['-'] = None
+    started = False
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            _fail("Unexpected loss of hub", 4)
+
+        try:
+            if not line.endswith('\n'):
+                raise ValueError(line)
+            message, _, value = line[:-1].partition(' ')
+
+            if line == 'gameover\n':
+                sys.exit(0)
+            elif message == 'newround':
+                player.new_round(_card(value))
+                started = True
+            elif message == 'yourturn' and started:
+                sys.stdout.write(player.your_turn(_card(value)) + '\n')
+                sys.stdout.flush()
+            elif message == 'replace' and started:
+                player.replace(_card(value))
+            elif message == 'thishappened' and started and len(value) == 8 and value[4] == '/' and value[0] != '-':
+                who, card, target, guess, discarder, discarded, out = (value[0], value[1], value[2], value[3],
+                                                                       value[5], value[6], value[7])
+                player.happened(ids[who], _card(card), ids[target], None if guess == '-' else _card(guess),
+                                ids[discarder], None if discarded == '-' else _card(discarded), ids[out])
+            else:
+                raise ValueError(line)
+        except (ValueError, KeyError):
+            _fail("Bad message from hub", 5)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,3209 @@
+#! /usr/bin/env python3
+__author__ = 'ben'
+
+import time
+
+# Taken before anything else is imported, for --startup-time when pyra.py doesn't pass its own
+STARTED = time.perf_counter()
+
+# Anything only some runs need (diffing, parallelism, stress, argument parsing) is imported where it's used
+import subprocess, os, sys, errno, shlex, signal, threading, io, math
+
+try:
+    import resource
+except ImportError:
+    # Windows has no rlimits; tests simply run unconstrained there
+    resource = None
+
+from lib.termcolor import colored as _colored
+
+# Seconds from pyra's first line until its tests are parsed and it's ready to run them
+STARTUP_BUDGET = 0.05
+
+# Where `pyra.py serve` listens by default, relative to the exec dir
+DEFAULT_SOCKET = 'testres/pyra.sock'
+
+# The script holding the tests, which shims standing in for players run
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pyra.py')
+
+def _plain(text, *args, **kwargs):
+    return text
+
+def use_color(enabled):
+    # Without colour, messages skip termcolor entirely
+    global colored
+    colored = _colored if enabled else _plain
+
+    # Only Windows consoles need colorama to translate ANSI codes
+    if enabled and os.name == 'nt':
+        from lib.colorama import init
+        init()
+
+use_color(sys.stdout.isatty())
+
+def text_lines(data):
+    # Splits into lines with universal newlines, as files opened in text mode read; bytes the encoding can't
+    # decode are kept as surrogates, so they still compare (and mismatch) rather than aborting the run
+    return io.TextIOWrapper(io.BytesIO(bytes(data)), newline=None, errors='surrogateescape').readlines()
+
+# Inputs with more lines than this (in total) are diffed by line hashing rather than difflib
+DIFF_THRESHOLD = 2000
+
+# Lines occurring more often than this can't anchor a hashed diff
+DIFF_MAX_OCCURRENCES = 64
+
+# Ranges without an anchor are diffed with Myers' algorithm, unless they differ by more edits than this
+DIFF_MAX_EDITS = 1000
+
+def _myers_blocks(a, b, alo, ahi, blo, bhi):
+    # Myers' O(ND) diff of a[alo:ahi] and b[blo:bhi], as single-line matches; None if too far apart
+    n, m = ahi - alo, bhi - blo
+    v = {1: 0}
+    trace = []
+
+    for d in range(min(n + m, DIFF_MAX_EDITS) + 1):
+        trace.append(v.copy())
+
+        for k in range(-d, d + 1, 2):
+            x = v[k + 1] if k == -d or (k != d and v[k - 1] < v[k + 1]) else v[k - 1] + 1
+            y = x - k
+
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+
+            v[k] = x
+
+            if x >= n and y >= m:
+                blocks = []
+
+                for d in range(len(trace) - 1, -1, -1):
+                    v = trace[d]
+                    k = x - y
+                    prevK = k + 1 if k == -d or (k != d and v[k - 1] < v[k + 1]) else k - 1
+                    prevX = v[prevK]
+                    prevY = prevX - prevK
+
+                    while x > prevX and y > prevY:
+                        x -= 1
+                        y -= 1
+                        blocks.append((alo + x, blo + y, 1))
+
+                    x, y = prevX, prevY
+
+                return blocks
+
+    return None
+
+def _matching_blocks(a, b):
+    # Histogram diff: anchor on the rarest line common to both sides, extend the match around it, and split
+    blocks = []
+    ranges = [(0, len(a), 0, len(b))]
+
+    while ranges:
+        alo, ahi, blo, bhi = ranges.pop()
+
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            blocks.append((start, blo - (alo - start), alo - start))
+
+        size = 0
+        while ahi - size > alo and bhi - size > blo and a[ahi - size - 1] == b[bhi - size - 1]:
+            size += 1
+        if size:
+            ahi -= size
+            bhi -= size
+            blocks.append((ahi, bhi, size))
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        counts = {}
+        for line in a[alo:ahi]:
+            counts[line] = counts.get(line, 0) + 1
+
+        anchor = None
+        for j in range(blo, bhi):
+            count = counts.get(b[j])
+            if count and (anchor is None or count < anchor[0]):
+                anchor = (count, j)
+                if count == 1:
+                    break
+
+        if anchor is None:
+            continue
+
+        if anchor[0] > DIFF_MAX_OCCURRENCES:
+            # Nothing rare enough in common; failing Myers too, the whole range is a replacement
+            blocks.extend(_myers_blocks(a, b, alo, ahi, blo, bhi) or [])
+            continue
+
+        j = anchor[1]
+        i = a.index(b[j], alo, ahi)
+
+        before = 0
+        while i - before > alo and j - before > blo and a[i - before - 1] == b[j - before - 1]:
+            before += 1
+
+        after = 1
+        while i + after < ahi and j + after < bhi and a[i + after] == b[j + after]:
+            after += 1
+
+        blocks.append((i - before, j - before, before + after))
+        ranges.append((alo, i - before, blo, j - before))
+        ranges.append((i + after, ahi, j + after, bhi))
+
+    blocks.sort()
+
+    # Merge adjacent blocks, as difflib does
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+
+    return merged + [(len(a), len(b), 0)]
+
+def _opcodes(blocks):
+    codes = []
+    i = j = 0
+
+    for ai, bj, size in blocks:
+        tag = 'replace' if i < ai and j < bj else 'delete' if i < ai else 'insert' if j < bj else None
+        if tag:
+            codes.append((tag, i, ai, j, bj))
+
+        i, j = ai + size, bj + size
+        if size:
+            codes.append(('equal', ai, i, bj, j))
+
+    return codes
+
+def _grouped_opcodes(codes, n):
+    # As difflib.SequenceMatcher.get_grouped_opcodes
+    codes = list(codes) or [('equal', 0, 1, 0, 1)]
+
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > n + n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+def _format_range(start, stop):
+    length = stop - start
+
+    if length == 1:
+        return '{}'.format(start + 1)
+
+    return '{},{}'.format(start + 1 if length else start, length)
+
+def unified_diff(a, b, fromfile='', tofile='', n=3):
+    # Same output as difflib.unified_diff, but in near-linear time on long outputs with many repeated lines
+    if len(a) + len(b) <= DIFF_THRESHOLD:
+        import difflib
+        return list(difflib.unified_diff(a, b, fromfile=fromfile, tofile=tofile, n=n))
+
+    # Compare lines by small integer ids rather than as strings
+    ids = {}
+    blocks = _matching_blocks([ids.setdefault(line, len(ids)) for line in a], [ids.setdefault(line, len(ids)) for line in b])
+
+    diff = []
+
+    for group in _grouped_opcodes(_opcodes(blocks), n):
+        if not diff:
+            diff.append('--- {}\n'.format(fromfile))
+            diff.append('+++ {}\n'.format(tofile))
+
+        diff.append('@@ -{} +{} @@\n'.format(_format_range(group[0][1], group[-1][2]), _format_range(group[0][3], group[-1][4])))
+
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                diff.extend(' ' + line for line in a[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                diff.extend('-' + line for line in a[i1:i2])
+            if tag in ('replace', 'insert'):
+                diff.extend('+' + line for line in b[j1:j2])
+
+    return diff
+
+class Comparator(object):
+    # Decides whether actual output matches what's expected; lines() gives what's diffed when it doesn't
+
+    def matches(self, expected, actual):
+        raise NotImplementedError
+
+    def lines(self, data):
+        return text_lines(data)
+
+class ExactComparator(Comparator):
+
+    def matches(self, expected, actual):
+        return expected == actual
+
+class TextComparator(Comparator):
+    # Line by line, with any style of newline
+
+    def matches(self, expected, actual):
+        return expected == actual or text_lines(expected) == text_lines(actual)
+
+class TrailingWhitespaceComparator(Comparator):
+
+    def matches(self, expected, actual):
+        return expected == actual or self.lines(expected) == self.lines(actual)
+
+    def lines(self, data):
+        lines = [line.rstrip() + '\n' for line in text_lines(data)]
+
+        while lines and lines[-1] == '\n':
+            lines.pop()
+
+        return lines
+
+class RegexComparator(Comparator):
+    # Each line of the expected output is a regular expression the corresponding actual line must match
+
+    def __init__(self):
+        self._patterns = {}
+
+    def matches(self, expected, actual):
+        import re
+
+        expected = bytes(expected)
+        patterns = self._patterns.get(expected)
+        if patterns is None:
+            patterns = self._patterns[expected] = [re.compile(line.rstrip('\n')) for line in text_lines(expected)]
+
+        actual = text_lines(actual)
+
+        return len(patterns) == len(actual) and all(pattern.fullmatch(line.rstrip('\n')) for pattern, line in zip(patterns, actual))
+
+class UnorderedComparator(Comparator):
+    # The same lines, in any order, e.g. for messages from concurrently running players
+
+    def matches(self, expected, actual):
+        return expected == actual or sorted(text_lines(expected)) == sorted(text_lines(actual))
+
+    def lines(self, data):
+        return sorted(text_lines(data))
+
+# Comparators available to tests, by name
+COMPARATORS = {
+    'exact': ExactComparator(),
+    'text': TextComparator(),
+    'trailing': TrailingWhitespaceComparator(),
+    'regex': RegexComparator(),
+    'unordered': UnorderedComparator()
+}
+
+class TestRunner(object):
+
+    # Default values for settings
+    DEFAULTS = {
+        'resultsDir': 'testres/',
+        'assetsDir': 'assets/',
+        'execDir': '.',
+        'timeout': 2,
+        'details': False,
+        'fullPath': False,
+        'limitAs': None,
+        'limitCpu': None,
+        'limitNproc': None,
+        'limitNofile': None,
+        'cgroup': None,
+        'jobs': 1,
+        'rerunFailures': 0,
+        'cpus': None,
+        'stress': 0,
+        'stressHogs': 0,
+        'stressChunk': 4,
+        'stressDelay': 0.002,
+        'compare': 'text',
+        'spawn': 'popen',
+        'capture': 'file',
+        'record': None,
+        'replay': None,
+        'profile': False,
+        'adaptiveTimeout': False,
+        'timeoutMultiplier': 5,
+        'timeoutFloor': 0.1,
+        'timeoutCeiling': None,
+        'isolate': False,
+        'history': None,
+        'impactBuild': False,
+        'impact': False,
+        'bundle': None,
+        'bundleCache': None
+    }
+
+    # SQLite database of past runs in resultsDir, unless --history-db names another
+    HISTORY_FILE = 'history.sqlite'
+
+    # Map from each test to the C source it covers, in resultsDir
+    IMPACT_FILE = 'impact.json'
+
+    # Durations kept per test for adaptive timeouts, and how many are needed before they're trusted
+    DURATION_HISTORY = 50
+    ADAPTIVE_MIN_RUNS = 5
+
+    # How much longer a test that runs out of its learned limit is given on its one retry
+    ADAPTIVE_RETRY = 2
+
+    # Phases of running tests timed by --profile, in the order they happen
+    PHASES = ['parse', 'plan', 'spawn', 'wait', 'read', 'diff', 'color', 'print']
+
+    # Ways of starting test processes
+    SPAWNERS = ['popen', 'posix_spawn', 'forkserver']
+
+    # Exit codes documented for the player
+    PLAYER_CODES = range(0, 6)
+
+    # Fuzzed input at most this long is minimized byte by byte, not just line by line
+    FUZZ_MINIMIZE_BYTES = 1024
+
+    # Ways of capturing test output: straight to the results files, or through pipes into memory
+    CAPTURES = ['file', 'pipe']
+
+    # Per-test pass/fail/flaky counts and recent durations, kept in resultsDir
+    STABILITY_FILE = 'stability.json'
+
+    # Expected output at least this large is mapped rather than read into memory
+    MMAP_THRESHOLD = 1024 * 1024
+
+    # Seconds that anything a piped test leaves running gets to finish writing once the test has exited
+    PIPE_GRACE = 0.1
+
+    # Types of output from the script
+    OUTPUTS = ['out', 'err']
+
+    # Per-test resource limits, as config key -> rlimit name
+    LIMITS = {
+        'limitAs': 'RLIMIT_AS',
+        'limitCpu': 'RLIMIT_CPU',
+        'limitNproc': 'RLIMIT_NPROC',
+        'limitNofile': 'RLIMIT_NOFILE'
+    }
+
+    # cgroup v2 interface files enforcing the limits for a whole test's process tree
+    CGROUP_LIMITS = {
+        'limitAs': 'memory.max',
+        'limitNproc': 'pids.max'
+    }
+
+    def _log(self, message, show = True):
+        if not show:
+            return
+
+        # Parallel tests buffer their output so it is printed together once the test is done
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            with self._timed('print'):
+                print(message, file=self.out)
+        else:
+            buffer.append(message)
+
+    def _timed(self, phase):
+        # Times a phase of the current test for --profile; costs next to nothing otherwise
+        return _PhaseTimer(self, phase) if self._config['profile'] else _UNTIMED
+
+    def _record_time(self, phase, seconds):
+        testNum = getattr(self._local, 'testNum', None)
+
+        with self._profileLock:
+            self._phaseTimes[phase] = self._phaseTimes.get(phase, 0) + seconds
+            self._phaseCounts[phase] = self._phaseCounts.get(phase, 0) + 1
+            if testNum is not None:
+                times = self._testTimes.setdefault(testNum, {})
+                times[phase] = times.get(phase, 0) + seconds
+
+    def _report_profile(self, elapsed):
+        total = sum(self._phaseTimes.values())
+
+        self._log("Time by phase over {:.1f}ms of running tests{}:".format(
+            elapsed * 1000, ' (summed across parallel tests)' if self._config['jobs'] > 1 else ''))
+        self._log("\t{:<8} {:>10} {:>7} {:>8} {:>10}".format('Phase', 'Total', 'Share', 'Count', 'Mean'))
+
+        for phase in self.PHASES:
+            seconds = self._phaseTimes.get(phase, 0)
+            count = self._phaseCounts.get(phase, 0)
+            self._log("\t{:<8} {:>8.2f}ms {:>6.1f}% {:>8} {:>8.3f}ms".format(
+                phase, seconds * 1000, 100 * seconds / total if total else 0, count, seconds * 1000 / count if count else 0))
+
+        # The harness's own time, leaving out the programs under test
+        overhead = lambda times: sum(seconds for phase, seconds in times.items() if phase != 'wait')
+        slowest = sorted(self._testTimes.items(), key=lambda item: -overhead(item[1]))[:5]
+
+        if slowest:
+            self._log("Tests with the most harness overhead:")
+            for testNum, times in slowest:
+                self._log("\tTest {}: {:.2f}ms ({})".format(testNum, overhead(times) * 1000, ', '.join(
+                    '{} {:.2f}ms'.format(phase, times[phase] * 1000) for phase in self.PHASES if phase in times and phase != 'wait')))
+
+        self._phaseTimes, self._phaseCounts, self._testTimes = {}, {}, {}
+
+    def _printDetail(self, message):
+        self._log(message, show = self._config['details'])
+
+    def _printNoDetail(self, message):
+        self._log(message, show = not self._config['details'])
+
+
+    def __init__(self, tests, config=None):
+        # Fill configuration options in with defaults
+        self._config = dict(self.DEFAULTS, **(config or {}))
+
+        self._local = threading.local()
+        self._printLock = threading.Lock()
+        self._executor = None
+        self._workers = 0
+        self._isolated = None
+        self._cleanup = None
+
+        # Time spent in each phase for --profile, in total and by test
+        self._profileLock = threading.Lock()
+        self._phaseTimes = {}
+        self._phaseCounts = {}
+        self._testTimes = {}
+
+        # Where results are written
+        self.out = sys.stdout
+
+        # Compiled test plans and expected output, reused across reruns, watch iterations and stress copies
+        self._plans = {}
+        self._expected = {}
+        self._expectedStamps = {}
+
+        # Parse tests
+        with self._timed('parse'):
+            self._parse_tests(tests)
+
+        self._cgroupRoot = self._find_cgroup(self._config['cgroup']) if self._config['cgroup'] else None
+
+        # Assets come from a packed bundle instead of the assets directory, where it has them
+        self._bundle = self._open_bundle(self._config['bundle']) if self._config['bundle'] else None
+
+        # Forked now, while the runner is still small, so that forking from it stays cheap
+        self._forkServer = _ForkServer(self) if self._config['spawn'] == 'forkserver' else None
+
+    def _open_bundle(self, path):
+        if path is True:
+            path = os.path.normpath(self._config['assetsDir']) + '.pack'
+
+        try:
+            bundle = _Bundle(path)
+        except (OSError, ValueError) as e:
+            self._log(colored("Couldn't open the asset bundle {} ({}); using the assets directory.".format(
+                path, e.strerror if isinstance(e, OSError) else "not an asset bundle"), 'yellow'))
+            return None
+
+        # Extracted files are kept by the bundle's contents, so a repacked bundle never sees stale ones
+        cache = self._config['bundleCache'] or os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'pyra')
+        self._bundleDir = os.path.join(cache, bundle.digest)
+
+        return bundle
+
+    def _bundled(self, path):
+        # The bundle's name for an absolute path in the assets directory, if the bundle has it
+        if self._bundle is None:
+            return None
+
+        assetsDir = os.path.abspath(self._config['assetsDir'])
+        if not path.startswith(assetsDir + os.sep):
+            return None
+
+        name = path[len(assetsDir) + 1:].replace(os.sep, '/')
+        return name if self._bundle.entry(name) is not None else None
+
+    def _parse_tests(self, tests):
+        res = []
+
+        for testLine in tests.split('\n'):
+            testLine = testLine.strip()
+
+            if not testLine or testLine.startswith('#'):
+                continue
+
+            test = testLine.split('|')
+
+            test = {
+                'exec': test[0],
+                'code': int(test[1]),
+                'in': test[2],
+                'out': test[3],
+                'err': test[4],
+                'compare': self._parse_compare(test[5], testLine),
+                'timeout': self._parse_timeout(test[6], testLine),
+                'args': test[7],
+                'name': test[8],
+                'raw': testLine
+            }
+
+            res.append(test)
+
+        self._tests = res
+
+    def _parse_timeout(self, spec, testLine):
+        # A time limit in seconds for this test alone, overriding the global and adaptive ones
+        if not spec.strip():
+            return None
+
+        try:
+            timeout = float(spec)
+        except ValueError:
+            timeout = 0
+
+        if timeout <= 0:
+            raise ValueError("Invalid timeout '{}' in test: {}".format(spec, testLine))
+
+        return timeout
+
+    def _parse_compare(self, spec, testLine):
+        # Either one comparator for both outputs, or output:comparator pairs, e.g. 'err:unordered'
+        compare = {}
+
+        for part in filter(None, spec.split(',')):
+            output, _, name = part.rpartition(':')
+
+            if name not in COMPARATORS or (output and output not in self.OUTPUTS):
+                raise ValueError("Unknown comparator '{}' in test: {}".format(part, testLine))
+
+            for key in ([output] if output else self.OUTPUTS):
+                compare[key] = name
+
+        return compare
+
+    def _own_cgroup(self):
+        # The cgroup v2 directory pyra itself is running in, if there is one
+        try:
+            with open('/proc/self/cgroup') as fd:
+                for line in fd:
+                    if line.startswith('0::'):
+                        # Hybrid hierarchies mount cgroup v2 separately
+                        mount = '/sys/fs/cgroup/unified' if os.path.isdir('/sys/fs/cgroup/unified') else '/sys/fs/cgroup'
+                        return os.path.normpath(mount + line[3:].strip())
+        except OSError:
+            pass
+
+        return None
+
+    def _find_cgroup(self, path):
+        # 'auto' places test cgroups beneath the cgroup pyra itself is running in
+        own = self._own_cgroup()
+        if path == 'auto':
+            path = own
+
+        if path is None or not os.path.exists(os.path.join(path, 'cgroup.controllers')) or not os.access(path, os.W_OK):
+            self._log(colored("cgroup v2 delegation is not available{}; using rlimits only.".format(
+                '' if path is None else ' at ' + path), 'yellow'))
+            return None
+
+        # A cgroup holding processes can't pass controllers down to its children, so when pyra is in the one given,
+        # it moves into a leaf of its own, and tests' cgroups go beside that leaf
+        base = os.path.join(path, 'pyra-{}'.format(os.getpid()))
+        runner = os.path.join(base, 'runner')
+        moved = own is not None and os.path.normpath(path) == own
+
+        try:
+            os.makedirs(runner, exist_ok=True)
+            if moved:
+                with open(os.path.join(runner, 'cgroup.procs'), 'w') as fd:
+                    fd.write(str(os.getpid()))
+        except OSError as e:
+            self._log(colored("Couldn't set up cgroups in {} ({}); using rlimits only.".format(path, e.strerror), 'yellow'))
+            return None
+
+        import atexit
+        atexit.register(self._cgroup_release, own if moved else None, base, runner)
+
+        for group in (path, base):
+            try:
+                with open(os.path.join(group, 'cgroup.subtree_control'), 'w') as fd:
+                    fd.write('+memory +pids')
+            except OSError:
+                pass
+
+        # Tests still get a cgroup for accounting and cleanup without the controllers, but not its limits
+        with open(os.path.join(base, 'cgroup.subtree_control')) as fd:
+            enabled = fd.read().split()
+        missing = [filename for key, filename in sorted(self.CGROUP_LIMITS.items())
+                   if self._config[key] is not None and filename.split('.')[0] not in enabled]
+        if missing:
+            self._log(colored("Couldn't enable the cgroup controllers for {} in {}; those limits are only rlimits.".format(
+                ', '.join(missing), base), 'yellow'))
+
+        return base
+
+    def _cgroup_release(self, home, base, runner):
+        # Moves pyra back to where it started and removes its cgroups, as far as anything left in them allows
+        try:
+            if home is not None:
+                with open(os.path.join(home, 'cgroup.procs'), 'w') as fd:
+                    fd.write(str(os.getpid()))
+            os.rmdir(runner)
+            os.rmdir(base)
+        except OSError:
+            pass
+
+    def _cgroup_create(self, testNum):
+        path = os.path.join(self._cgroupRoot, 'test-{}'.format(testNum))
+        os.makedirs(path, exist_ok=True)
+
+        for key, filename in self.CGROUP_LIMITS.items():
+            if self._config[key] is not None and os.path.exists(os.path.join(path, filename)):
+                with open(os.path.join(path, filename), 'w') as fd:
+                    fd.write(str(self._config[key]))
+
+        return path
+
+    def _cgroup_read(self, cgroup, filename):
+        # Parses flat-keyed files such as cpu.stat and memory.events
+        try:
+            with open(os.path.join(cgroup, filename)) as fd:
+                return dict((key, int(value)) for key, value in (line.split() for line in fd))
+        except OSError:
+            return {}
+
+    def _cgroup_destroy(self, cgroup):
+        # Kill anything the test left behind (e.g. players orphaned by the hub) before removing the group,
+        # which may already have gone
+        try:
+            if os.path.exists(os.path.join(cgroup, 'cgroup.kill')):
+                with open(os.path.join(cgroup, 'cgroup.kill'), 'w') as fd:
+                    fd.write('1')
+            else:
+                with open(os.path.join(cgroup, 'cgroup.procs')) as fd:
+                    for pid in fd.read().split():
+                        try:
+                            os.kill(int(pid), signal.SIGKILL)
+                        except OSError:
+                            pass
+        except FileNotFoundError:
+            return
+
+        for _ in range(100):
+            try:
+                os.rmdir(cgroup)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.01)
+
+    def _preexec(self, cgroup):
+        limits = [(getattr(resource, name), self._config[key]) for key, name in self.LIMITS.items()
+                  if self._config[key] is not None]
+
+        def preexec():
+            if self._config['cpus']:
+                os.sched_setaffinity(0, self._config['cpus'])
+
+            if cgroup is not None:
+                with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as fd:
+                    fd.write('0')
+
+            for limit, value in limits:
+                # CPU gets a second of grace between SIGXCPU and SIGKILL so the cause can be reported
+                resource.setrlimit(limit, (value, value + 1 if limit == resource.RLIMIT_CPU else value))
+
+        return preexec
+
+    def _wait(self, proc, timeout, cgroup):
+        # Returns (rusage, limit), where limit names any resource limit the test was killed for
+        if not hasattr(os, 'wait4'):
+            proc.communicate(timeout=timeout)
+            return None, None
+
+        deadline = time.time() + timeout
+        delay = 0.0005
+
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                proc.returncode = _exit_code(status)
+                return {'utime': usage.ru_utime, 'stime': usage.ru_stime, 'maxrss': usage.ru_maxrss}, None
+
+            # RLIMIT_CPU is per process, so the tree as a whole is held to the limit via the cgroup
+            if cgroup is not None and self._config['limitCpu'] is not None:
+                if self._cgroup_read(cgroup, 'cpu.stat').get('usage_usec', 0) > self._config['limitCpu'] * 1e6:
+                    self._kill(proc)
+                    return None, 'cpu'
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+
+            time.sleep(min(delay, remaining, 0.05))
+            delay *= 2
+
+    def _kill(self, proc):
+        # Tests run in their own session, so this takes out the hub's players too
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            proc.kill()
+        proc.wait()
+
+    def _posix_spawn(self, argv, stdin, stdout, stderr):
+        # Unlike fork, posix_spawn doesn't copy the runner's page tables, so it stays fast however big the runner gets
+        actions = [(os.POSIX_SPAWN_DUP2, fd if isinstance(fd, int) else fd.fileno(), target)
+                   for fd, target in ((stdin, 0), (stdout, 1), (stderr, 2))]
+
+        # Python ignores SIGPIPE; restore the default as Popen does, or players wouldn't die writing to a dead hub
+        pid = os.posix_spawn(argv[0], argv, os.environ, file_actions=actions, setsid=True,
+                             setsigdef=(signal.SIGPIPE, signal.SIGXFSZ))
+
+        return _SpawnedProcess(pid, argv)
+
+    def _spawn(self, plan, stdin, stdout, stderr, preexec):
+        # Tests run in the exec dir, unless the plan has a directory of its own
+        cwd = plan.get('cwd') or self._config['execDir']
+
+        # posix_spawn can neither change directory nor run preexec_fn, so Popen covers those cases
+        if self._config['spawn'] == 'posix_spawn' and preexec is None and hasattr(os, 'posix_spawn') \
+                and os.path.samefile(os.getcwd(), cwd):
+            spawn = lambda argv: self._posix_spawn(argv, stdin, stdout, stderr)
+        else:
+            spawn = lambda argv: subprocess.Popen(argv, stdin = stdin, stdout = stdout, stderr = stderr,
+                                                  cwd = cwd, start_new_session = os.name == 'posix',
+                                                  preexec_fn = preexec)
+
+        try:
+            return spawn(plan['argv'])
+        except OSError as e:
+            # Scripts without a #! line are run by the shell, as they were when tests ran through one
+            if e.errno != errno.ENOEXEC:
+                raise
+            return spawn(['/bin/sh'] + plan['argv'])
+
+    def _launch(self, plan, cgroup, capture=False, timeout=None):
+        # Runs a planned test to completion, returning (exit code, timed out, limit hit, resource usage, output),
+        # where output maps 'out' and 'err' to what was captured in memory, if capture was asked for
+        timeout = timeout or self._config['timeout']
+        useLimits = resource is not None and any(self._config[key] is not None for key in self.LIMITS)
+        preexec = self._preexec(cgroup) if useLimits or cgroup or self._config['cpus'] else None
+
+        if capture:
+            return self._launch_piped(plan, cgroup, preexec, timeout)
+
+        with open(plan['supplied_in'], 'rb') as stdin, open(plan['actual_out'], 'wb') as stdout, \
+                open(plan['actual_err'], 'wb') as stderr, self._timed('spawn'):
+            try:
+                proc = self._spawn(plan, stdin, stdout, stderr, preexec)
+            except OSError as e:
+                # Reported the way a shell would have
+                stderr.write(self._spawn_error(plan, e))
+                return 126 if e.errno == errno.EACCES else 127, False, None, None, None
+
+        try:
+            with self._timed('wait'):
+                usage, limit = self._wait(proc, timeout, cgroup)
+        except subprocess.TimeoutExpired:
+            self._kill(proc)
+            return None, True, None, None, None
+
+        return proc.returncode, False, limit, usage, None
+
+    def _spawn_error(self, plan, e):
+        return "{}: {}\n".format(plan['exec_sh'], e.strerror).encode()
+
+    def _launch_piped(self, plan, cgroup, preexec, timeout):
+        # The kernel copies stdin from the asset into the pipe and output is read straight into buffers
+        # sized from the expected output, so passing tests never touch the results directory
+        bundled = plan.get('supplied_bundled')
+        if bundled is not None:
+            source, start, end = os.dup(self._bundle.fileno()), bundled[0], bundled[0] + bundled[1]
+        else:
+            source, start, end = os.open(plan['supplied_in'], os.O_RDONLY), 0, None
+        inRead, inWrite = os.pipe()
+        outRead, outWrite = os.pipe()
+        errRead, errWrite = os.pipe()
+
+        try:
+            with self._timed('spawn'):
+                proc = self._spawn(plan, inRead, outWrite, errWrite, preexec)
+        except OSError as e:
+            for fd in (source, inWrite, outRead, errRead):
+                os.close(fd)
+            return 126 if e.errno == errno.EACCES else 127, False, None, None, {'out': b'', 'err': self._spawn_error(plan, e)}
+        finally:
+            for fd in (inRead, outWrite, errWrite):
+                os.close(fd)
+
+        hints = {}
+        for output in self.OUTPUTS:
+            try:
+                bundled = self._bundled(plan['expected_' + output])
+                hints[output] = self._bundle.entry(bundled)[1] if bundled else os.stat(plan['expected_' + output]).st_size
+            except (KeyError, OSError):
+                hints[output] = 0
+
+        captured = {}
+        pump = threading.Thread(target=_pump, args=(source, inWrite, {'out': outRead, 'err': errRead}, hints, captured, start, end))
+        pump.daemon = True
+        pump.start()
+
+        try:
+            with self._timed('wait'):
+                usage, limit = self._wait(proc, timeout, cgroup)
+
+                # Output is complete once everything holding the pipes has gone, which is usually as the test exits
+                pump.join(self.PIPE_GRACE)
+        except subprocess.TimeoutExpired:
+            self._kill(proc)
+            pump.join(1)
+            return None, True, None, None, captured
+
+        if pump.is_alive():
+            # Whatever the test left running is killed, as file capture would have stopped waiting for it; the test
+            # itself has exited, so it hasn't timed out
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            if cgroup is not None and os.path.exists(os.path.join(cgroup, 'cgroup.kill')):
+                with open(os.path.join(cgroup, 'cgroup.kill'), 'w') as fd:
+                    fd.write('1')
+            pump.join(1)
+
+        return proc.returncode, False, limit, usage, captured
+
+    def _execute(self, plan, testNum, timeout=None):
+        # Returns (exit code, timed out, limit hit, output captured in memory or None, resource usage or None);
+        # timeout defaults to the global one
+        useLimits = resource is not None and any(self._config[key] is not None for key in self.LIMITS)
+        cgroup = self._cgroup_create(testNum) if self._cgroupRoot else None
+
+        try:
+            # The fork server always writes to the results files, rather than sending output back over its socket
+            if self._forkServer is not None:
+                # Spawning happens in the fork server, so it's all waiting from here
+                with self._timed('wait'):
+                    code, timedOut, limit, usage, captured = self._forkServer.launch(plan, cgroup, timeout)
+            else:
+                code, timedOut, limit, usage, captured = self._launch(plan, cgroup, self._config['capture'] == 'pipe', timeout)
+
+            if timedOut:
+                return None, True, None, captured, None
+
+            if limit is None and cgroup is not None:
+                if self._cgroup_read(cgroup, 'memory.events').get('oom_kill', 0):
+                    limit = 'memory'
+                elif self._cgroup_read(cgroup, 'pids.events').get('max', 0):
+                    limit = 'process'
+
+            # Shell-wrapped programs report a child killed by SIGXCPU as 128 + signal
+            if limit is None and useLimits and code in (-signal.SIGXCPU, 128 + signal.SIGXCPU):
+                limit = 'cpu'
+            if limit is None and usage is not None and self._config['limitCpu'] is not None:
+                if usage['utime'] + usage['stime'] >= self._config['limitCpu']:
+                    limit = 'cpu'
+
+            return code, False, limit, captured, usage
+        finally:
+            if cgroup is not None:
+                self._cgroup_destroy(cgroup)
+
+    def _outputs(self, plan, captured):
+        # A run's output by stream, from memory when it was captured there and otherwise from the results files
+        outputs = {}
+        for output in self.OUTPUTS:
+            if captured is not None:
+                outputs[output] = bytes(captured.get(output, b''))
+            else:
+                with open(plan['actual_' + output], 'rb') as fd:
+                    outputs[output] = fd.read()
+
+        return outputs
+
+    def _isolate(self, testNum):
+        # A private working directory for one run of a test: links to everything in the exec dir, so files the
+        # test creates there stay its own. Files are hard linked where possible and directories symlinked, so
+        # existing files are still shared if rewritten in place.
+        import itertools
+
+        with self._printLock:
+            if self._isolated is None:
+                self._isolated = itertools.count()
+            path = os.path.join(os.path.abspath(self._config['resultsDir']), 'isolated', 'test.{}.{}'.format(testNum, next(self._isolated)))
+
+        os.makedirs(path)
+
+        resultsDir = os.path.abspath(self._config['resultsDir'])
+        for entry in os.scandir(os.path.abspath(self._config['execDir'])):
+            # Results stay shared, and mustn't contain themselves
+            if entry.path == resultsDir:
+                continue
+
+            target = os.path.join(path, entry.name)
+            if entry.is_file(follow_symlinks=False):
+                try:
+                    os.link(entry.path, target)
+                    continue
+                except OSError:
+                    pass
+
+            os.symlink(entry.path, target)
+
+        return path
+
+    def _discard(self, path):
+        # Isolated directories are removed in the background, off the tests' critical path
+        import shutil
+
+        with self._printLock:
+            if self._cleanup is None:
+                import atexit, queue
+                self._cleanup = queue.Queue()
+
+                def clean():
+                    while True:
+                        shutil.rmtree(self._cleanup.get(), ignore_errors=True)
+                        self._cleanup.task_done()
+
+                cleaner = threading.Thread(target=clean)
+                cleaner.daemon = True
+                cleaner.start()
+
+                # What's left is removed before pyra exits
+                atexit.register(self._cleanup.join)
+
+        self._cleanup.put(path)
+
+    def _color_diff(self, diff):
+        colours = {
+            '+': 'cyan',
+            '-': 'red',
+            '?': 'yellow',
+            ' ': 'white',
+            '@': 'yellow'
+        }
+
+        defaultColour = 'white'
+
+        # Undecodable bytes kept by text_lines are shown as replacement characters, which any terminal can print
+        with self._timed('color'):
+            return [colored(line.encode(errors='surrogateescape').decode(errors='replace'), colours.get(line[0], defaultColour))
+                    for line in diff]
+
+
+    def _plan(self, testNum, test, name=None, cache=True):
+        # Resolves a test's argv and files once; name overrides the test.N prefix of the result files
+        cacheKey = (testNum, test['args'], name)
+
+        plan = self._plans.get(cacheKey)
+        if plan is not None:
+            return plan
+
+        execDir = os.path.abspath(self._config['execDir'])
+        name = name or 'test.{}'.format(testNum)
+
+        plan = test.copy()
+
+        plan['exec'] = os.path.join(execDir, test['exec'])
+        plan['actual_out'] = os.path.join(self._config['resultsDir'], name + '.out')
+        plan['actual_err'] = os.path.join(self._config['resultsDir'], name + '.err')
+        plan['supplied_in'] = os.path.join(self._config['assetsDir'], test['in'])
+        plan['expected_out'] = os.path.join(self._config['assetsDir'], test['out'])
+        plan['expected_err'] = os.path.join(self._config['assetsDir'], test['err'])
+
+        for key in ['exec', 'actual_out', 'actual_err', 'supplied_in', 'expected_out', 'expected_err']:
+            plan[key] = os.path.normpath(os.path.join(execDir, plan[key]))
+
+            # Shown relative to the exec dir, as they'd be typed there
+            shown = plan[key]
+            if not self._config['fullPath'] and shown.startswith(execDir.rstrip(os.sep) + os.sep):
+                shown = os.path.join('.', shown[len(execDir.rstrip(os.sep)) + 1:])
+            plan[key + '_rel'] = shown
+            plan[key + '_sh'] = shown if self._config['fullPath'] else shlex.quote(shown)
+
+        plan['argv'] = [plan['exec']] + shlex.split(test['args'])
+
+        if self._bundle is not None:
+            # Programs and the files they're given need real paths, so bundled ones are extracted, once
+            for k, arg in enumerate(plan['argv']):
+                bundled = self._bundled(os.path.normpath(os.path.join(execDir, arg)))
+                if bundled is not None:
+                    plan['argv'][k] = self._bundle.extract(bundled, self._bundleDir)
+
+            # Piped input is fed straight from the bundle; the fork server only takes files
+            bundled = self._bundled(plan['supplied_in'])
+            if bundled is not None:
+                if self._config['capture'] == 'pipe' and self._config['spawn'] != 'forkserver':
+                    plan['supplied_bundled'] = self._bundle.entry(bundled)
+                else:
+                    plan['supplied_in'] = self._bundle.extract(bundled, self._bundleDir)
+        plan['cmd'] = '{exec_sh} {args} < {supplied_in_sh} 1> {actual_out_sh} 2> {actual_err_sh}'.format(**plan)
+
+        # One-off runs, like tournament games, aren't worth keeping
+        if cache:
+            self._plans[cacheKey] = plan
+
+        return plan
+
+    def _read_expected(self, path):
+        data = self._expected.get(path)
+
+        if data is None and self._bundle is not None:
+            bundled = self._bundled(path)
+            if bundled is not None:
+                data = self._expected[path] = self._bundle.read(bundled)
+
+        if data is None:
+            with open(path, 'rb') as fd:
+                stat = os.fstat(fd.fileno())
+                size = stat.st_size
+                if size >= self.MMAP_THRESHOLD:
+                    import mmap
+                    data = memoryview(mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ))
+                else:
+                    data = fd.read()
+
+            self._expected[path] = data
+            self._expectedStamps[path] = stat.st_mtime_ns, size
+
+        return data
+
+    def _run_test(self, testNum, test, name=None, timeout=None, group=None):
+        # Returns a result dict; name overrides the test.N prefix of the result files, and the test's own
+        # timeout overrides timeout, which defaults to the global one. group names the test's cgroup when
+        # copies of it run at once
+        timeout = test['timeout'] or timeout or self._config['timeout']
+        cmdColour = 'white'
+        self._local.testNum = testNum
+
+        with self._timed('plan'):
+            opts = self._plan(testNum, test, name)
+
+        self._printDetail("Test {}: \n\t{}".format(testNum, colored(opts['cmd'], cmdColour)))
+
+        success = True
+
+        isolated = self._isolate(testNum) if self._config['isolate'] else None
+
+        started = time.time()
+        code, timedOut, limit, captured, usage = self._execute(dict(opts, cwd=isolated) if isolated else opts,
+                                                               testNum if group is None else group, timeout)
+        duration = time.time() - started
+
+        if isolated:
+            self._discard(isolated)
+
+        if timedOut:
+            self._log("Execution timed out after {:g} seconds...".format(round(timeout, 3)))
+            success = False
+
+        if limit is not None:
+            self._log("Killed after exceeding the {} limit...".format(limit))
+            success = False
+
+        if success:
+            # Check code
+            if code != opts['code']:
+                self._printDetail("Failed with wrong exit code; got {} but expecting {}".format(code, opts['code']))
+                success = False
+
+            # Check stdout & stderr
+            for output in self.OUTPUTS:
+
+                expectedFile = opts['expected_' + output]
+                actualFile = opts['actual_' + output]
+
+                data = {
+                    'expected': opts['expected_' + output + '_sh'],
+                    'actual': opts['actual_' + output + '_sh']
+                }
+
+                diffCmd = "diff {expected} {actual}".format(**data)
+
+                with self._timed('read'):
+                    expected = self._read_expected(expectedFile)
+
+                    if captured is not None:
+                        actual = captured.get(output, b'')
+                    else:
+                        with open(actualFile, 'rb') as fd:
+                            actual = fd.read()
+
+                comparator = COMPARATORS[opts['compare'].get(output, self._config['compare'])]
+
+                with self._timed('diff'):
+                    matches = comparator.matches(expected, actual)
+
+                if matches:
+                    continue
+
+                success = False
+
+                # Diffs are only worth building when they'll be shown
+                if self._config['details']:
+                    with self._timed('diff'):
+                        diff = unified_diff(comparator.lines(expected), comparator.lines(actual),
+                                            fromfile = '{} (expected)'.format(opts['expected_' + output + '_rel']),
+                                            tofile = '{} (actual)'.format(opts['actual_' + output + '_rel']))
+
+                    self._printDetail("{} differs:\n\t{}".format(output, colored(diffCmd, cmdColour)))
+                    self._printDetail('-' * 80)
+                    self._printDetail("".join(self._color_diff(diff)))
+                    self._printDetail('-' * 80)
+
+        # Captured output is only kept on disk where it's worth looking at
+        if captured is not None:
+            for output in self.OUTPUTS:
+                path = opts['actual_' + output]
+                if success:
+                    if os.path.exists(path):
+                        os.unlink(path)
+                else:
+                    with open(path, 'wb') as fd:
+                        fd.write(captured.get(output, b''))
+
+        with self._timed('color'):
+            if limit is not None:
+                outcome = colored("KILLED", 'magenta')
+            else:
+                outcome = colored("PASSED", 'green') if success else colored("FAILED", 'red')
+
+        self._printDetail(outcome)
+
+        self._printNoDetail(colored("Test {} {}".format(testNum, outcome), 'green' if success else 'red'))
+
+        if not success:
+            self._printDetail(colored(test['raw'], 'yellow'))
+
+        self._printDetail("=" * 80)
+
+        return {
+            'success': success,
+            'code': code,
+            'timedOut': timedOut,
+            'limit': limit,
+            'actual_out': opts['actual_out'],
+            'actual_err': opts['actual_err'],
+            'captured': captured,
+            'duration': duration,
+            'usage': usage
+        }
+
+    def _run_buffered(self, testNum, test, name=None, timeout=None, group=None):
+        self._local.buffer = []
+        try:
+            return self._run_test(testNum, test, name, timeout, group)
+        finally:
+            buffer, self._local.buffer = self._local.buffer, None
+            with self._printLock, self._timed('print'):
+                for message in buffer:
+                    print(message, file=self.out)
+
+    def _pool(self):
+        # Kept for the runner's lifetime, so a long-lived runner's workers are already warm
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(self._config['jobs'])
+
+        return self._executor
+
+    def _load_stability(self):
+        import json
+        try:
+            with open(os.path.join(self._config['resultsDir'], self.STABILITY_FILE)) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return {}
+
+    def _record_history(self, tests, results, flaky):
+        # One transaction per run, with all its results inserted at once
+        db = _open_history(self._history_path())
+
+        try:
+            with db:
+                run = db.execute("INSERT INTO runs (started, jobs) VALUES (?, ?)", (time.time(), self._config['jobs'])).lastrowid
+
+                rows = []
+                for i, test in tests:
+                    result = results[i]
+                    usage = result['usage'] or {}
+
+                    # A test that passed on rerun is flaky, however its first run failed
+                    if i in flaky:
+                        outcome = 'flaky'
+                    elif result['limit'] is not None:
+                        outcome = 'killed'
+                    elif result['timedOut']:
+                        outcome = 'timeout'
+                    else:
+                        outcome = 'passed' if result['success'] else 'failed'
+
+                    rows.append((run, test['raw'], i, test['name'], outcome, result['code'], result['duration'],
+                                 usage.get('utime'), usage.get('stime'), usage.get('maxrss')))
+
+                db.executemany("INSERT INTO results (run, test, number, name, outcome, code, duration, utime, stime, maxrss) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            db.close()
+
+    def _history_path(self):
+        if self._config['history'] is True:
+            return os.path.join(self._config['resultsDir'], self.HISTORY_FILE)
+
+        return self._config['history']
+
+    def _adaptive_timeout(self, test, stability):
+        # A multiple of the test's 99th percentile duration so far, between the floor and the ceiling (the global timeout by default)
+        if not self._config['adaptiveTimeout']:
+            return None
+
+        durations = sorted(stability.get(test['raw'], {}).get('durations', []))
+        if len(durations) < self.ADAPTIVE_MIN_RUNS:
+            return None
+
+        p99 = durations[max(int(math.ceil(len(durations) * 0.99)) - 1, 0)]
+        ceiling = self._config['timeoutCeiling'] or self._config['timeout']
+
+        return min(max(p99 * self._config['timeoutMultiplier'], self._config['timeoutFloor']), ceiling)
+
+    def _save_stability(self, stability):
+        import json
+        path = os.path.join(self._config['resultsDir'], self.STABILITY_FILE)
+
+        with open(path + '.tmp', 'w') as fd:
+            json.dump(stability, fd, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def run_tests(self, indices=None):
+        started = time.perf_counter()
+
+        if not os.path.exists(self._config['resultsDir']):
+            os.makedirs(self._config['resultsDir'])
+
+        if indices is None:
+            indices = range(1, len(self._tests) + 1)
+
+        tests = [(i, self._transcribed(i, self._tests[i - 1])) for i in indices if 1 <= i <= len(self._tests)]
+
+        # Tests identify themselves by their spec line, since names are optional and not unique
+        stability = self._load_stability()
+        isFlaky = lambda test: stability.get(test['raw'], {}).get('flaky', 0) > 0
+
+        timeouts = dict((i, self._adaptive_timeout(test, stability)) for i, test in tests)
+
+        results = {}
+
+        if self._config['jobs'] > 1:
+            # Known-flaky tests go first, on their own, so they aren't racing the rest of the suite
+            for i, test in tests:
+                if isFlaky(test):
+                    results[i] = self._run_buffered(i, test, timeout=timeouts[i])
+
+            futures = [(i, self._pool().submit(self._run_buffered, i, test, None, timeouts[i])) for i, test in tests if i not in results]
+            for i, future in futures:
+                results[i] = future.result()
+        else:
+            for i, test in tests:
+                results[i] = self._run_test(i, test, timeout=timeouts[i])
+
+        # A learned limit only says how slow the test has been. Running out of it is recorded as a duration of at least
+        # that long, so the limit rises, and the test is retried once with a little more; only tests with no history
+        # are given the full limit
+        censored = {}
+        retries = []
+        for i, test in tests:
+            if results[i]['timedOut'] and timeouts[i] is not None and not test['timeout']:
+                censored[i] = [timeouts[i]]
+                retries.append((i, test, min(timeouts[i] * self.ADAPTIVE_RETRY, self._config['timeoutCeiling'] or self._config['timeout'])))
+                self._log(colored("Test {} timed out after its learned {:g}s limit; retrying with {:g}s".format(
+                    i, round(timeouts[i], 3), round(retries[-1][2], 3)), 'yellow'))
+
+        if self._config['jobs'] > 1:
+            futures = [(i, limit, self._pool().submit(self._run_buffered, i, test, None, limit)) for i, test, limit in retries]
+            retried = [(i, limit, future.result()) for i, limit, future in futures]
+        else:
+            retried = [(i, limit, self._run_test(i, test, timeout=limit)) for i, test, limit in retries]
+
+        for i, limit, result in retried:
+            results[i] = result
+            if result['timedOut']:
+                censored[i].append(limit)
+
+        flaky = []
+        failed = [(i, test) for i, test in tests if not results[i]['success']] if self._config['rerunFailures'] else []
+
+        for i, test in failed:
+            passes = sum(self._run_test(i, test)['success'] for _ in range(self._config['rerunFailures']))
+
+            if passes:
+                flaky.append(i)
+                results[i] = dict(results[i], success=True)
+                self._log(colored("Test {} FLAKY: passed {}/{} reruns".format(i, passes, self._config['rerunFailures']), 'yellow'))
+            else:
+                self._log(colored("Test {} FAILED consistently over {} runs".format(i, self._config['rerunFailures'] + 1), 'red'))
+
+        for i, test in tests:
+            history = stability.setdefault(test['raw'], {'runs': 0, 'failures': 0, 'flaky': 0})
+            history['runs'] += 1
+            history['failures'] += i in flaky or not results[i]['success']
+            history['flaky'] += i in flaky
+
+            # Runs cut short by a resource limit say nothing about how long the test takes
+            durations = censored.get(i, [])
+            if not results[i]['timedOut'] and results[i]['limit'] is None:
+                durations = durations + [results[i]['duration']]
+            if durations:
+                history['durations'] = (history.get('durations', []) + [round(duration, 6) for duration in durations])[-self.DURATION_HISTORY:]
+
+        self._save_stability(stability)
+
+        if self._config['history']:
+            self._record_history(tests, results, flaky)
+
+        res = [results[i]['success'] for i, _ in tests]
+        limited = sum(results[i]['limit'] is not None for i, _ in tests)
+
+        self._log("Passed {}/{} tests!".format(sum(res), len(tests)))
+
+        if flaky:
+            self._log(colored("{} flaky test(s) passed only on rerun:".format(len(flaky)), 'yellow'))
+            for i in flaky:
+                history = stability[self._tests[i - 1]['raw']]
+                self._log(colored("\tTest {}: flaky in {} of {} runs, failed first time in {}".format(
+                    i, history['flaky'], history['runs'], history['failures']), 'yellow'))
+
+        if limited:
+            self._log(colored("{} test(s) killed for exceeding resource limits.".format(limited), 'magenta'))
+
+        if self._config['profile']:
+            self._report_profile(time.perf_counter() - started)
+
+        return dict((i, results[i]['success']) for i, _ in tests)
+
+    def _players(self, test):
+        # Argument positions naming player programs: every existing file after the hub's deck
+        args = shlex.split(test['args'])
+
+        return args, [k for k, arg in enumerate(args)
+                      if k > 0 and os.path.isfile(os.path.join(self._config['execDir'], arg))]
+
+    def _shim(self, player, mode, options):
+        # An executable standing in for a player, which runs it through `pyra.py <mode>`
+        import hashlib
+        player = os.path.abspath(os.path.join(self._config['execDir'], player))
+        key = hashlib.sha1(repr((player, mode, options)).encode()).hexdigest()[:12]
+
+        shimDir = os.path.join(os.path.abspath(self._config['resultsDir']), 'shims')
+        path = os.path.join(shimDir, '{}-{}-{}'.format(mode, key, os.path.basename(player)))
+
+        if not os.path.exists(path):
+            os.makedirs(shimDir, exist_ok=True)
+            command = [sys.executable, LAUNCHER, mode] + options + ['--', player]
+            with open(path + '.tmp', 'w') as fd:
+                fd.write('#!/bin/sh\nexec {} "$@"\n'.format(' '.join(shlex.quote(part) for part in command)))
+            os.chmod(path + '.tmp', 0o755)
+            os.replace(path + '.tmp', path)
+
+        return path
+
+    def _transcribed(self, i, test):
+        # The test with its players recorded to, or replayed from, transcripts in the record or replay directory
+        mode = 'record' if self._config['record'] else 'replay' if self._config['replay'] else None
+        if mode is None:
+            return test
+
+        import hashlib
+        directory = os.path.abspath(self._config[mode])
+        key = hashlib.sha1(test['raw'].encode()).hexdigest()[:12]
+
+        args, players = self._players(test)
+        for k in players:
+            transcript = os.path.join(directory, 'test.{}-{}.{}.json'.format(key, k, os.path.basename(args[k])))
+
+            if mode == 'record':
+                os.makedirs(directory, exist_ok=True)
+            elif not os.path.exists(transcript):
+                self._log(colored("Test {}: no recording of {}, running it for real".format(i, args[k]), 'yellow'))
+                continue
+
+            args[k] = self._shim(args[k], mode, ['--transcript', transcript])
+
+        return dict(test, args=' '.join(shlex.quote(arg) for arg in args))
+
+    def _signature(self, result):
+        import hashlib
+        digest = hashlib.sha1()
+
+        outputs = self._outputs(result, result['captured'])
+        for output in self.OUTPUTS:
+            digest.update(outputs[output])
+
+        return result['code'], result['timedOut'], digest.hexdigest()
+
+    def stress(self, indices=None, copies=8):
+        os.makedirs(os.path.join(self._config['resultsDir'], 'stress'), exist_ok=True)
+
+        if indices is None:
+            indices = range(1, len(self._tests) + 1)
+
+        options = ['--max-chunk', str(self._config['stressChunk']), '--max-delay', str(self._config['stressDelay'])]
+
+        # Busy loops competing for the same CPUs as the tests
+        pin = (lambda: os.sched_setaffinity(0, self._config['cpus'])) if self._config['cpus'] else None
+        hogs = [subprocess.Popen([sys.executable, '-c', 'while True: pass'], preexec_fn=pin)
+                for _ in range(self._config['stressHogs'])]
+
+        unstable = []
+
+        try:
+            for i in indices:
+                if not 1 <= i <= len(self._tests):
+                    continue
+
+                test = self._tests[i - 1]
+
+                # Players have their output fragmented on its way to the hub
+                args, players = self._players(test)
+                for k in players:
+                    args[k] = self._shim(args[k], 'relay', options)
+                stressed = dict(test, args=' '.join(shlex.quote(arg) for arg in args))
+
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(copies) as pool:
+                    futures = [pool.submit(self._run_buffered, i, stressed, os.path.join('stress', 'test.{}.{}'.format(i, copy)),
+                                           group='{}.{}'.format(i, copy))
+                               for copy in range(copies)]
+                    results = [future.result() for future in futures]
+
+                variants = {}
+                for copy, result in enumerate(results):
+                    variants.setdefault(self._signature(result), []).append(copy)
+
+                passed = sum(result['success'] for result in results)
+                summary = "Test {}: passed {}/{} copies".format(i, passed, copies)
+
+                if len(variants) > 1:
+                    unstable.append(i)
+                    self._log(colored("{}, NONDETERMINISTIC with {} distinct outputs:".format(summary, len(variants)), 'red'))
+                    for (code, timedOut, digest), members in sorted(variants.items(), key=lambda item: -len(item[1])):
+                        self._log(colored("\t{} copies (e.g. {}): exit code {}{}".format(
+                            len(members), results[members[0]]['actual_out'], code, ', timed out' if timedOut else ''), 'yellow'))
+                else:
+                    self._log(colored(summary + ", deterministic", 'green' if passed == copies else 'yellow'))
+        finally:
+            for hog in hogs:
+                hog.kill()
+                hog.wait()
+
+        self._log("{}/{} tests produced nondeterministic output under stress.".format(len(unstable), len(list(indices))))
+
+        return unstable
+
+    def _ddmin(self, items, reproduces):
+        # Delta debugging: the smallest sublist of items found to still reproduce, trying each round's candidates in parallel
+        n = 2
+
+        while len(items) >= 2:
+            bounds = [(len(items) * k // n, len(items) * (k + 1) // n) for k in range(n)]
+            subsets = [items[start:end] for start, end in bounds]
+            complements = [items[:start] + items[end:] for start, end in bounds] if n > 2 else []
+
+            outcomes = list(self._pool().map(reproduces, subsets + complements))
+
+            if any(outcomes[:n]):
+                items, n = subsets[outcomes.index(True)], 2
+            elif any(outcomes[n:]):
+                items, n = complements[outcomes.index(True, n) - n], max(n - 1, 2)
+            elif n >= len(items):
+                break
+            else:
+                n = min(n * 2, len(items))
+
+        return items
+
+    def _reduce_run(self, testNum, test, files, memo):
+        # Runs the test with the given contents for the files at some argument positions, returning its failure signature
+        import hashlib, shutil
+
+        key = hashlib.sha1(repr(sorted(files.items())).encode()).hexdigest()[:12]
+        if key in memo:
+            return memo[key]
+
+        name = os.path.join('reduce', 'test.{}'.format(testNum), key)
+        directory = os.path.join(self._config['resultsDir'], name)
+        os.makedirs(directory, exist_ok=True)
+
+        args = shlex.split(test['args'])
+        for k, content in files.items():
+            original = os.path.join(self._config['execDir'], args[k])
+            args[k] = os.path.abspath(os.path.join(directory, os.path.basename(args[k])))
+            with open(args[k], 'w') as fd:
+                fd.write(content)
+            shutil.copymode(original, args[k])
+
+        plan = self._plan(testNum, dict(test, args=' '.join(shlex.quote(arg) for arg in args)), os.path.join(name, 'result'))
+        # Candidates run in parallel, so each worker's runs get a cgroup of their own
+        code, timedOut, limit, captured, _ = self._execute(plan, 'reduce{}'.format(self._worker()))
+        outputs = self._outputs(plan, captured)
+
+        # What the hub says on stderr identifies the failure, since its normal output depends on the game played
+        memo[key] = code, timedOut, limit, outputs['err'], outputs
+        return memo[key]
+
+    def reduce(self, testNum, outputDir=None):
+        # Shrinks a failing hub test's deck and scripted players to a minimal test failing the same way
+        import shutil
+
+        test = self._tests[testNum - 1]
+        result = self._run_test(testNum, test)
+
+        if result['success']:
+            self._log(colored("Test {} passes; there's nothing to reduce.".format(testNum), 'yellow'))
+            return None
+
+        args, players = self._players(test)
+
+        # The deck comes first, and scripted players are the shell stubs
+        decks = [0] if args and args[0].endswith('.deck') and os.path.isfile(os.path.join(self._config['execDir'], args[0])) else []
+        scripts = [k for k in players if args[k].endswith('.sh')]
+
+        files = {}
+        for k in decks + scripts:
+            with open(os.path.join(self._config['execDir'], args[k])) as fd:
+                files[k] = fd.read()
+
+        if not files:
+            self._log(colored("Test {} has no deck or scripted players to reduce.".format(testNum), 'yellow'))
+            return None
+
+        memo = {}
+        target = self._reduce_run(testNum, test, files, memo)[:4]
+        self._log("Reducing test {}: exit code {}{}, stderr {!r}".format(
+            testNum, target[0], ', timed out' if target[1] else '', target[3].decode(errors='replace')))
+
+        if target[0] == test['code'] and not target[3]:
+            self._log(colored("The failure only shows in stdout, which depends on the game played; "
+                              "the reduced test will exit the same way, but may not be wrong in the same way.", 'yellow'))
+
+        def reducer(k, split, join):
+            # Reduces the parts of file k, as split from and joined back into its content
+            def reproduces(parts):
+                candidate = dict(files)
+                candidate[k] = join(parts)
+                return self._reduce_run(testNum, test, candidate, memo)[:4] == target
+            files[k] = join(self._ddmin(split(files[k]), reproduces))
+
+        while True:
+            before = sum(len(content) for content in files.values())
+
+            for k in decks:
+                # Whole rounds, then cards within each round
+                reducer(k, lambda content: content.splitlines(True), ''.join)
+
+                rounds = files[k].splitlines(True)
+                for r in range(len(rounds)):
+                    rest = lambda cards, r=r: ''.join(rounds[:r] + [''.join(cards) + ('\n' if rounds[r].endswith('\n') else '')] + rounds[r + 1:])
+                    reducer(k, lambda content, r=r: list(rounds[r].rstrip('\n')), rest)
+                    rounds = files[k].splitlines(True)
+
+            for k in scripts:
+                reducer(k, lambda content: content.splitlines(True), ''.join)
+
+            if sum(len(content) for content in files.values()) == before:
+                break
+
+        code, timedOut, limit, err, outputs = self._reduce_run(testNum, test, files, memo)
+
+        # The reduced test's files, named after the originals, and expected output as the programs now produce it
+        outputDir = outputDir or os.path.join(self._config['resultsDir'], 'reduced', 'test.{}'.format(testNum))
+        os.makedirs(outputDir, exist_ok=True)
+
+        for k, content in files.items():
+            path = os.path.join(outputDir, os.path.basename(args[k]))
+            with open(path, 'w') as fd:
+                fd.write(content)
+            shutil.copymode(os.path.join(self._config['execDir'], args[k]), path)
+            args[k] = './' + os.path.relpath(path, self._config['execDir'])
+
+        for output in self.OUTPUTS:
+            with open(os.path.join(outputDir, 'reduced.' + output), 'wb') as fd:
+                fd.write(outputs[output])
+
+        relative = lambda name: os.path.relpath(os.path.join(outputDir, name), self._config['assetsDir'])
+        row = '|'.join([test['exec'], str(test['code']), test['in'], relative('reduced.out'), relative('reduced.err'),
+                        test['raw'].split('|')[5], test['raw'].split('|')[6], ' '.join(shlex.quote(arg) for arg in args),
+                        'Reduced: ' + (test['name'] or 'test {}'.format(testNum))])
+
+        self._log(colored("Reduced test {} in {} runs, to files in {}:".format(testNum, len(memo), outputDir), 'green'))
+        for k in sorted(files):
+            self._log("\t{}: {} line(s), {} bytes".format(args[k], len(files[k].splitlines()), len(files[k])))
+        self._log("The expected output files hold what the hub printed; correct them to what it should print.")
+        self._log(row)
+
+        return row
+
+    def _worker(self):
+        # A small number for the current thread, to name the files it reuses from run to run
+        worker = getattr(self._local, 'worker', None)
+        if worker is None:
+            with self._printLock:
+                worker = self._local.worker = self._workers
+                self._workers += 1
+
+        return worker
+
+    def _fuzz_run(self, program, args, data):
+        # Runs program on data, returning its failure bucket (None if it behaved) and what it printed
+        worker = self._worker()
+
+        name = os.path.join('fuzz', 'work', str(worker))
+        path = os.path.join(self._config['resultsDir'], name + '.in')
+        with open(path, 'wb') as fd:
+            fd.write(data)
+
+        test = {'exec': program, 'code': 0, 'in': os.path.abspath(path), 'out': 'empty', 'err': 'empty', 'compare': {}, 'args': args, 'name': '', 'raw': ''}
+        plan = self._plan('fuzz', test, name)
+
+        # Each worker has its own cgroup name, as tests running at once must
+        code, timedOut, limit, captured, _ = self._execute(plan, 'fuzz{}'.format(worker))
+
+        # Pipe capture never writes the result files, and files left from other runs mustn't be mistaken for these
+        outputs = self._outputs(plan, captured)
+
+        if timedOut:
+            kind = 'hang', None
+        elif limit is not None:
+            kind = 'limit', limit
+        elif code < 0 or code >= 128:
+            kind = 'signal', code if code < 0 else 128 - code
+        elif code not in self.PLAYER_CODES:
+            kind = 'exit', code
+        else:
+            return None, outputs
+
+        # The last thing the program said, with numbers masked, tells failures apart
+        import re
+        lines = [line for line in outputs['err'].decode(errors='replace').splitlines() if line.strip()]
+        return kind + (re.sub(r'\d+', '#', lines[-1].strip()) if lines else '',), outputs
+
+    def fuzz(self, program='./player', runs=1000, seed=None, outputDir=None):
+        # Feeds mutated hub messages to program, reporting crashes, hangs and undocumented exit codes
+        import random, hashlib
+
+        rng = random.Random(seed)
+
+        seeds = []
+        for test in self._tests:
+            path = os.path.join(self._config['assetsDir'], test['in'])
+            if test['exec'] == program and os.path.isfile(path) and os.path.getsize(path):
+                with open(path, 'rb') as fd:
+                    seeds.append((test['args'], fd.read()))
+
+        if not seeds:
+            self._log(colored("No tests feed {} any input to start from.".format(program), 'yellow'))
+            return {}
+
+        outputDir = outputDir or os.path.join(self._config['resultsDir'], 'fuzz')
+        os.makedirs(os.path.join(self._config['resultsDir'], 'fuzz', 'work'), exist_ok=True)
+        os.makedirs(outputDir, exist_ok=True)
+
+        corpus = [data for _, data in seeds]
+        buckets = {}
+        batch = max(self._config['jobs'], 1) * 16
+        started = time.time()
+
+        for first in range(0, runs, batch):
+            cases = []
+            for _ in range(min(batch, runs - first)):
+                args, data = rng.choice(seeds)
+                cases.append((args, _mutate(data, rng, corpus)))
+
+            outcomes = list(self._pool().map(lambda case: self._fuzz_run(program, case[0], case[1])[0], cases))
+
+            for case, bucket in zip(cases, outcomes):
+                if bucket is not None:
+                    buckets.setdefault(bucket, []).append(case)
+
+        elapsed = time.time() - started
+        self._log("Ran {} {} times in {:.1f}s ({:.0f} per minute): {} distinct failure(s).".format(
+            program, runs, elapsed, runs * 60 / max(elapsed, 1e-6), len(buckets)))
+
+        rows = []
+        for bucket, cases in sorted(buckets.items(), key=lambda item: -len(item[1])):
+            args, data = min(cases, key=lambda case: len(case[1]))
+
+            # Lines, then bytes of short enough streams, that can go while the program still fails the same way
+            reproduces = lambda parts: self._fuzz_run(program, args, b''.join(parts))[0] == bucket
+            data = b''.join(self._ddmin(data.splitlines(True), reproduces))
+            if len(data) <= self.FUZZ_MINIMIZE_BYTES:
+                data = b''.join(self._ddmin([data[k:k + 1] for k in range(len(data))], reproduces))
+
+            # Run once more to keep what it printed
+            _, outputs = self._fuzz_run(program, args, data)
+
+            name = 'fuzz_' + hashlib.sha1(repr(bucket).encode()).hexdigest()[:8]
+            with open(os.path.join(outputDir, name + '.in'), 'wb') as fd:
+                fd.write(data)
+            for output in self.OUTPUTS:
+                with open(os.path.join(outputDir, name + '.' + output), 'wb') as fd:
+                    fd.write(outputs[output])
+
+            # Malformed messages should end the player with status 5
+            relative = lambda suffix: os.path.relpath(os.path.join(outputDir, name + suffix), self._config['assetsDir'])
+            kind, value, message = bucket
+            rows.append('|'.join([program, '5', relative('.in'), relative('.out'), relative('.err'), '', '', args,
+                                  'Fuzzed: {}{} {}'.format(kind, '' if value is None else ' ' + str(value), name)]))
+
+            self._log(colored("{} x {}{}{}: {!r}".format(len(cases), kind, '' if value is None else ' ' + str(value),
+                                                         ', "{}"'.format(message) if message else '', data), 'red'))
+
+        if rows:
+            with open(os.path.join(outputDir, 'TESTS'), 'a') as fd:
+                fd.write(''.join(row + '\n' for row in rows))
+
+            self._log("Reproducers and their TESTS rows are in {}; their expected output is what {} printed.".format(outputDir, program))
+            for row in rows:
+                self._log(row)
+
+        return buckets
+
+    def _game(self, hub, deck, seating):
+        # Plays one game, returning the seats of its winners, or the hub's complaint if it didn't finish properly
+        name = os.path.join('tournament', 'work', str(self._worker()))
+        test = {'exec': hub, 'code': 0, 'in': 'empty', 'out': 'empty', 'err': 'empty', 'compare': {},
+                'args': ' '.join(shlex.quote(arg) for arg in [deck] + list(seating)), 'name': '', 'raw': ''}
+
+        plan = self._plan('tournament', test, name, cache=False)
+        code, timedOut, limit, captured, _ = self._execute(plan, 'tournament{}'.format(self._worker()))
+
+        outputs = dict((output, data.decode(errors='replace')) for output, data in self._outputs(plan, captured).items())
+
+        winners = [line for line in outputs['out'].splitlines() if line.startswith('Winner(s):')]
+
+        if timedOut or code != 0 or not winners:
+            complaint = outputs['err'].strip().splitlines()
+            return None, 'timed out' if timedOut else complaint[-1] if complaint else 'exit code {}'.format(code)
+
+        return [ord(seat) - ord('A') for seat in winners[-1].split(':', 1)[1].split()], None
+
+    def tournament(self, players, hub='./hub', decks=None, randomDecks=0, rounds=12, seats=2, seed=None):
+        # Plays every seating of the players on every deck, reporting win rates and Elo ratings
+        import itertools, random
+
+        rng = random.Random(seed)
+
+        # The same player can enter more than once, e.g. to measure the advantage of going first
+        names = []
+        for player in players:
+            names.append(player if player not in names else '{} #{}'.format(player, sum(name.split(' #')[0] == player for name in names) + 1))
+
+        decks = list(decks or [])
+        if randomDecks:
+            # Shuffles of a standard deck, as in the sample decks
+            cards = list('1111122334455678')
+            directory = os.path.join(self._config['resultsDir'], 'tournament', 'decks')
+            os.makedirs(directory, exist_ok=True)
+
+            for k in range(randomDecks):
+                path = os.path.join(directory, 'random.{}.deck'.format(k))
+                with open(path, 'w') as fd:
+                    for _ in range(rounds):
+                        rng.shuffle(cards)
+                        fd.write(''.join(cards) + '\n')
+                decks.append(os.path.abspath(path))
+
+        os.makedirs(os.path.join(self._config['resultsDir'], 'tournament', 'work'), exist_ok=True)
+
+        games = [(deck, seating) for deck in decks for seating in itertools.permutations(range(len(players)), seats)]
+        if not games:
+            self._log(colored("No games to play: give decks or --random, and at least {} players.".format(seats), 'yellow'))
+            return None
+
+        score = [0.0] * len(players)
+        played = [0] * len(players)
+        # Pairwise results for the ratings: wins[i][j] is how often i beat j, draws counting half
+        wins = [[0.0] * len(players) for _ in players]
+        failures = {}
+
+        def play(game):
+            deck, seating = game
+            return game, self._game(hub, deck, [players[k] for k in seating])
+
+        started = reported = time.time()
+        done = 0
+
+        # Submitted in batches, so tens of thousands of games don't all queue at once
+        batch = max(self._config['jobs'], 1) * 64
+        for first in range(0, len(games), batch):
+            for (deck, seating), (winners, complaint) in self._pool().map(play, games[first:first + batch]):
+                done += 1
+
+                if winners is None:
+                    failures.setdefault(complaint, []).append((deck, seating))
+                    continue
+
+                winners = set(seating[seat] for seat in winners if 0 <= seat < len(seating))
+                for k in seating:
+                    played[k] += 1
+                    if k in winners:
+                        score[k] += 1.0 / len(winners)
+
+                for i in seating:
+                    for j in seating:
+                        if i != j:
+                            wins[i][j] += 1.0 if i in winners and j not in winners else 0.5 if (i in winners) == (j in winners) else 0.0
+
+            if time.time() - reported >= 5 and done < len(games):
+                reported = time.time()
+                self._log("{}/{} games played ({:.0f} per second)".format(done, len(games), done / (reported - started)))
+
+        ratings = _elo(wins)
+
+        self._log("{} games on {} deck(s), {} seats each, in {:.1f}s:".format(len(games), len(decks), seats, time.time() - started))
+        self._log("{:<30} {:>7} {:>9} {:>17} {:>6}".format('Player', 'Games', 'Win rate', '95% interval', 'Elo'))
+
+        for k in sorted(range(len(players)), key=lambda k: -ratings[k]):
+            low, high = _wilson(score[k], played[k])
+            rate = score[k] / played[k] if played[k] else 0
+            self._log("{:<30} {:>7} {:>8.1f}% {:>7.1f}% - {:>5.1f}% {:>6.0f}".format(
+                names[k], played[k], rate * 100, low * 100, high * 100, ratings[k]))
+
+        if failures:
+            self._log(colored("{} game(s) didn't finish with a winner:".format(sum(len(games) for games in failures.values())), 'red'))
+            for complaint, failed in sorted(failures.items(), key=lambda item: -len(item[1])):
+                deck, seating = failed[0]
+                self._log(colored("\t{} x {} (e.g. {} with {})".format(
+                    len(failed), complaint, deck, ' '.join(names[k] for k in seating)), 'red'))
+
+        return dict((names[k], {'games': played[k], 'score': score[k], 'elo': ratings[k]}) for k in range(len(players)))
+
+    def tests(self):
+        # (number, test) pairs, numbered from 1 as on the command line
+        return list(enumerate(self._tests, 1))
+
+    def run_test(self, testNum):
+        # Runs one test on its own, returning its result dict
+        if not os.path.exists(self._config['resultsDir']):
+            os.makedirs(self._config['resultsDir'], exist_ok=True)
+
+        return self._run_test(testNum, self._tests[testNum - 1])
+
+    def _coverage_dirs(self):
+        # Directories of gcov notes files in the exec dir, i.e. where instrumented programs write their counts
+        dirs = set()
+        resultsDir = os.path.abspath(self._config['resultsDir'])
+
+        for root, subdirs, files in os.walk(os.path.abspath(self._config['execDir'])):
+            subdirs[:] = [d for d in subdirs if d != '.git' and os.path.join(root, d) != resultsDir]
+            if any(name.endswith('.gcno') for name in files):
+                dirs.add(root)
+
+        return sorted(dirs)
+
+    def _coverage(self, dirs):
+        # Lines and functions executed since the counts were last cleared, by source file relative to the exec dir,
+        # along with every instrumented file; the counts are cleared afterwards
+        import json, tempfile, shutil
+
+        execDir = os.path.abspath(self._config['execDir'])
+        covered = {}
+        instrumented = set()
+
+        def add(path, lines, functions):
+            path = os.path.relpath(os.path.normpath(path), execDir)
+            instrumented.add(path)
+            if lines or functions:
+                entry = covered.setdefault(path, {'lines': set(), 'functions': {}})
+                entry['lines'].update(lines)
+                entry['functions'].update(functions)
+
+        for directory in dirs:
+            counts = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.gcda')]
+            if not counts:
+                continue
+
+            scratch = tempfile.mkdtemp(prefix='pyra-gcov-')
+            try:
+                # JSON on stdout from GCC 9 on; earlier versions only have the intermediate text format
+                proc = subprocess.run(['gcov', '--stdout', '--json-format', '-o', directory] + counts, cwd=scratch,
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+                reports = []
+                if proc.returncode == 0:
+                    try:
+                        reports = [json.loads(line) for line in proc.stdout.decode().splitlines() if line.strip()]
+                    except ValueError:
+                        reports = []
+
+                if reports:
+                    for report in reports:
+                        base = report.get('current_working_directory', directory)
+                        for source in report['files']:
+                            add(os.path.join(base, source['file']),
+                                [line['line_number'] for line in source['lines'] if line['count']],
+                                dict((function['name'], (function['start_line'], function['end_line']))
+                                     for function in source['functions'] if function['execution_count']))
+                else:
+                    subprocess.run(['gcov', '-i', '-o', directory] + counts, cwd=scratch,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    for name in os.listdir(scratch):
+                        if name.endswith('.gcov'):
+                            with open(os.path.join(scratch, name)) as fd:
+                                for path, lines, functions in _gcov_intermediate(fd):
+                                    add(os.path.join(directory, path), lines, functions)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+            for path in counts:
+                os.unlink(path)
+
+        return covered, instrumented
+
+    def _git(self, *args):
+        proc = subprocess.run(['git'] + list(args), cwd=self._config['execDir'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return proc.stdout.decode() if proc.returncode == 0 else None
+
+    def build_impact(self, indices=None):
+        # Runs tests one at a time against gcov-instrumented builds, mapping each to the source it covers
+        import json
+
+        dirs = self._coverage_dirs()
+        if not dirs:
+            self._log(colored("No gcov notes (.gcno) in the exec dir; build the hub and player with --coverage first.", 'red'))
+            return None
+
+        if indices is None:
+            indices = range(1, len(self._tests) + 1)
+
+        os.makedirs(self._config['resultsDir'], exist_ok=True)
+
+        # Counts left over from before belong to no test
+        self._coverage(dirs)
+
+        tests = {}
+        instrumented = set()
+
+        for i in indices:
+            if not 1 <= i <= len(self._tests):
+                continue
+
+            test = self._tests[i - 1]
+
+            # Instrumented programs add to shared count files, so tests can't overlap here
+            self._run_test(i, test)
+            covered, seen = self._coverage(dirs)
+            instrumented |= seen
+
+            tests[test['raw']] = dict((path, {'lines': sorted(entry['lines']),
+                                              'functions': sorted([name] + list(span) for name, span in entry['functions'].items())})
+                                      for path, entry in covered.items())
+
+        impact = {
+            'commit': (self._git('rev-parse', 'HEAD') or '').strip() or None,
+            'instrumented': sorted(instrumented),
+            'tests': tests
+        }
+
+        path = os.path.join(self._config['resultsDir'], self.IMPACT_FILE)
+        with open(path + '.tmp', 'w') as fd:
+            json.dump(impact, fd)
+        os.replace(path + '.tmp', path)
+
+        self._log("Mapped {} tests to {} instrumented source file(s), at commit {}.".format(
+            len(tests), len(instrumented), (impact['commit'] or 'unknown')[:12]))
+
+        return impact
+
+    def impacted(self, indices=None):
+        # The tests covering C source changed since the impact map was built, and those it doesn't know
+        import json
+
+        if indices is None:
+            indices = range(1, len(self._tests) + 1)
+        indices = [i for i in indices if 1 <= i <= len(self._tests)]
+
+        try:
+            with open(os.path.join(self._config['resultsDir'], self.IMPACT_FILE)) as fd:
+                impact = json.load(fd)
+        except (OSError, ValueError):
+            self._log(colored("No impact map; run with --impact-build first. Running every test.", 'yellow'))
+            return indices
+
+        # Against the commit the map was built at, so the old side's line numbers are the map's
+        diff = self._git('diff', '--unified=0', '--relative', '--no-color', impact['commit'] or 'HEAD', '--', '*.c', '*.h')
+        if diff is None:
+            self._log(colored("Couldn't diff against {}; running every test.".format(impact['commit']), 'yellow'))
+            return indices
+
+        changes = _diff_ranges(diff)
+        everything = [path for path in changes if path.endswith('.h') or path not in impact['instrumented']]
+
+        if everything:
+            self._log("Running every test: {} changed, which coverage can't attribute.".format(', '.join(sorted(everything))))
+            return indices
+
+        def affected(coverage):
+            for path, ranges in changes.items():
+                entry = coverage.get(path)
+                if entry is None:
+                    continue
+
+                lines = entry['lines']
+                for start, end in ranges:
+                    # Changed lines it ran, or changes inside a function it ran (which catches insertions and deletions)
+                    if any(start <= line <= end for line in lines):
+                        return True
+                    if any(first <= end and start <= last for _, first, last in entry['functions']):
+                        return True
+
+            return False
+
+        selected = [i for i in indices if self._tests[i - 1]['raw'] not in impact['tests'] or affected(impact['tests'][self._tests[i - 1]['raw']])]
+
+        self._log("{} of {} tests cover the {} changed C file(s).".format(len(selected), len(indices), len(changes)))
+
+        return selected
+
+    def _dependencies(self, test):
+        # The executable, assets and any path-like arguments (decks, player scripts) a test reads
+        deps = set([
+            os.path.join(self._config['execDir'], test['exec']),
+            os.path.join(self._config['assetsDir'], test['in']),
+            os.path.join(self._config['assetsDir'], test['out']),
+            os.path.join(self._config['assetsDir'], test['err'])
+        ])
+
+        for arg in shlex.split(test['args']):
+            if os.sep in arg or (os.altsep and os.altsep in arg):
+                deps.add(os.path.join(self._config['execDir'], arg))
+
+        return set(os.path.normpath(os.path.join(os.path.abspath(self._config['execDir']), path)) for path in deps)
+
+    def _snapshot(self, paths):
+        snapshot = {}
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[path] = None
+
+        return snapshot
+
+    def watch(self, indices=None, interval=0.5):
+        if indices is None:
+            indices = range(1, len(self._tests) + 1)
+
+        deps = dict((i, self._dependencies(self._tests[i - 1])) for i in indices if 1 <= i <= len(self._tests))
+        watched = set().union(*deps.values())
+
+        results = self.run_tests(indices=sorted(deps))
+        snapshot = self._snapshot(watched)
+
+        self._log(colored("Watching {} files for changes...".format(len(watched)), 'yellow'))
+
+        try:
+            while True:
+                time.sleep(interval)
+
+                current = self._snapshot(watched)
+                if current == snapshot:
+                    continue
+
+                # Let builds finish writing before running anything against them
+                while True:
+                    time.sleep(interval)
+                    settled = self._snapshot(watched)
+                    if settled == current:
+                        break
+                    current = settled
+
+                changed = set(path for path in watched if current[path] != snapshot[path])
+                snapshot = current
+
+                for path in changed:
+                    self._expected.pop(path, None)
+
+                # Failures first, then in table order
+                affected = sorted((i for i in deps if deps[i] & changed), key=lambda i: (results.get(i, False), i))
+
+                self._log(colored("Changed: {}".format(", ".join(sorted(os.path.relpath(path, self._config['execDir']) for path in changed))), 'yellow'))
+
+                if affected:
+                    results.update(self.run_tests(indices=affected))
+
+                self._log(colored("Watching {} files for changes...".format(len(watched)), 'yellow'))
+        except KeyboardInterrupt:
+            pass
+
+    def serve(self, path):
+        # Runs tests for `pyra.py client` requests on a Unix socket, one request at a time
+        import socket, socketserver, json
+
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                self._log(colored("A pyra server is already listening on {}.".format(path), 'red'))
+                return
+            except OSError:
+                # Left behind by a server that didn't shut down cleanly
+                os.unlink(path)
+            finally:
+                probe.close()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        runner = self
+        out = self.out
+        details = self._config['details']
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                request = json.loads(self.rfile.readline().decode())
+
+                # Only files changed since they were read are read again
+                stamps = runner._snapshot(list(runner._expectedStamps))
+                for path, stamp in stamps.items():
+                    if stamp != runner._expectedStamps[path]:
+                        runner._expected.pop(path, None)
+                        runner._expectedStamps.pop(path, None)
+                runner._config['details'] = request.get('details', details)
+                runner.out = _JsonLineWriter(self.wfile)
+                use_color(request.get('color', False))
+
+                try:
+                    results = runner.run_tests(indices=request.get('tests'))
+                    self.wfile.write((json.dumps({'results': results}) + '\n').encode())
+                except (BrokenPipeError, ConnectionResetError):
+                    runner.out = out
+                    runner._log(colored("Client went away before its tests finished.", 'yellow'))
+                finally:
+                    runner.out = out
+
+        server = socketserver.UnixStreamServer(path, Handler)
+        self._log(colored("Serving {} tests on {}".format(len(self._tests), path), 'yellow'))
+
+        # Clean up the socket when stopped by a service manager, too
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(path)
+
+# Bytes moved into a test's stdin per system call
+PUMP_CHUNK = 1024 * 1024
+
+# Ways of copying a file into a pipe, best first; dropped from as they turn out unsupported here
+_copiers = ['splice', 'sendfile', 'read']
+
+# Pumps for parallel tests can find a copier unsupported at once, and only one of them may drop it
+_copiersLock = threading.Lock()
+
+def _copy_to_pipe(source, sink, offset, count=PUMP_CHUNK):
+    # Copies the next chunk of source, of at most count bytes, into sink, returning how much was copied
+    count = min(count, PUMP_CHUNK)
+    if count <= 0:
+        return 0
+
+    while True:
+        copier = _copiers[0]
+        try:
+            if copier == 'splice':
+                return os.splice(source, sink, count, offset_src=offset, flags=os.SPLICE_F_NONBLOCK)
+            elif copier == 'sendfile':
+                return os.sendfile(sink, source, offset, count)
+            else:
+                data = os.pread(source, count, offset)
+                return os.write(sink, data) if data else 0
+        except (AttributeError, OSError) as e:
+            if copier == 'read' or isinstance(e, OSError) and e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP):
+                raise
+            with _copiersLock:
+                if _copiers[0] == copier and len(_copiers) > 1:
+                    _copiers.pop(0)
+
+def _pump(source, sink, sources, hints, captured, start=0, end=None):
+    # Feeds the source file (from start to end, or its end) into the sink pipe and reads each source pipe to its end,
+    # filling in captured by output name
+    import selectors
+
+    buffers = {}
+    selector = selectors.DefaultSelector()
+
+    for output, fd in sources.items():
+        # One byte over the expected size, so output matching it is seen to end without growing the buffer
+        buffers[fd] = [bytearray(max(hints.get(output, 0) + 1, 4096)), 0]
+        selector.register(fd, selectors.EVENT_READ, output)
+
+    offset = start
+    os.set_blocking(sink, False)
+    selector.register(sink, selectors.EVENT_WRITE)
+
+    try:
+        while selector.get_map():
+            for key, _ in selector.select():
+                if key.fd == sink:
+                    try:
+                        copied = _copy_to_pipe(source, sink, offset, PUMP_CHUNK if end is None else end - offset)
+                    except BlockingIOError:
+                        continue
+                    except BrokenPipeError:
+                        # Programs needn't read all their input
+                        copied = 0
+
+                    offset += copied
+                    if not copied:
+                        selector.unregister(sink)
+                        os.close(sink)
+                    continue
+
+                buffer = buffers[key.fd]
+                if buffer[1] == len(buffer[0]):
+                    buffer[0].extend(bytes(len(buffer[0])))
+
+                with memoryview(buffer[0]) as view:
+                    count = os.readv(key.fd, [view[buffer[1]:]])
+
+                buffer[1] += count
+                if not count:
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+                    captured[key.data] = memoryview(buffer[0])[:buffer[1]]
+    finally:
+        os.close(source)
+        for key in list(selector.get_map().values()):
+            os.close(key.fd)
+        selector.close()
+
+# Words of the hub to player protocol, which mutations swap in
+PROTOCOL_TOKENS = [b'newround', b'yourturn', b'thishappened', b'gameover', b'-', b'A', b'B', b'C', b'D'] + \
+    [str(card).encode() for card in range(10)]
+
+def _mutate(data, rng, corpus):
+    # A random token or byte level change to a message stream, or a few of them
+    for _ in range(rng.choice([1, 1, 1, 2, 3])):
+        lines = data.splitlines(True) or [b'']
+        k = rng.randrange(len(lines))
+        tokens = lines[k].split(b' ')
+        mutation = rng.randrange(10)
+
+        if mutation == 0:
+            # Replace a token with a protocol word
+            j = rng.randrange(len(tokens))
+            tokens[j] = rng.choice(PROTOCOL_TOKENS) + (b'\n' if tokens[j].endswith(b'\n') else b'')
+            lines[k] = b' '.join(tokens)
+        elif mutation == 1:
+            # Drop a token
+            if len(tokens) > 1:
+                del tokens[rng.randrange(len(tokens))]
+            lines[k] = b' '.join(tokens)
+        elif mutation == 2:
+            # Duplicate a token
+            j = rng.randrange(len(tokens))
+            tokens.insert(j, tokens[j].rstrip(b'\n'))
+            lines[k] = b' '.join(tokens)
+        elif mutation == 3:
+            # Drop, duplicate or move a whole message
+            line = lines.pop(k)
+            if rng.random() < 0.7:
+                lines.insert(rng.randrange(len(lines) + 1), line)
+        elif mutation == 4:
+            # Splice in a message from another stream
+            other = rng.choice(corpus).splitlines(True)
+            if other:
+                lines.insert(k, rng.choice(other))
+        elif mutation == 5:
+            # Truncate the stream
+            lines = lines[:k + 1]
+            lines[k] = lines[k][:rng.randrange(len(lines[k]) + 1)]
+        else:
+            stream = bytearray(b''.join(lines))
+            at = rng.randrange(len(stream) + 1)
+
+            if mutation == 6 and stream:
+                stream[min(at, len(stream) - 1)] ^= 1 << rng.randrange(8)
+            elif mutation == 7:
+                stream[at:at] = bytes([rng.choice([rng.randrange(256), 32, 10, 0, 48 + rng.randrange(10)])])
+            elif mutation == 8:
+                del stream[at:at + rng.randint(1, 4)]
+            else:
+                # Long runs, e.g. of digits or spaces
+                stream[at:at] = bytes([rng.choice(b'0 9A\n')]) * rng.choice([2, 16, 256, 4096])
+
+            lines = [bytes(stream)]
+
+        data = b''.join(lines)
+
+    return data
+
+def _wilson(successes, trials, z=1.96):
+    # Wilson score interval for a proportion
+    if not trials:
+        return 0.0, 1.0
+
+    p = successes / trials
+    centre = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    spread = z * ((p * (1 - p) + z * z / (4 * trials)) / trials) ** 0.5 / (1 + z * z / trials)
+
+    return max(centre - spread, 0.0), min(centre + spread, 1.0)
+
+def _elo(wins, iterations=200):
+    # Elo ratings fitted to all pairwise results at once (a Bradley-Terry model), so game order doesn't matter;
+    # each pair also gets a drawn game, keeping players who never (or always) win finite
+    import math
+
+    n = len(wins)
+    games = [[wins[i][j] + wins[j][i] + (1 if i != j else 0) for j in range(n)] for i in range(n)]
+    won = [sum(wins[i][j] + 0.5 for j in range(n) if j != i) for i in range(n)]
+    strength = [1.0] * n
+
+    for _ in range(iterations):
+        strength = [won[i] / (sum(games[i][j] / (strength[i] + strength[j]) for j in range(n) if j != i) or 1) for i in range(n)]
+        mean = math.exp(sum(math.log(value) for value in strength) / n)
+        strength = [value / mean for value in strength]
+
+    return [1500 + 400 * math.log10(value) for value in strength]
+
+class _PhaseTimer(object):
+
+    def __init__(self, runner, phase):
+        self._runner = runner
+        self._phase = phase
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self._runner._record_time(self._phase, time.perf_counter() - self._start)
+
+class _Untimed(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_UNTIMED = _Untimed()
+
+HISTORY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    jobs INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    test TEXT NOT NULL,
+    number INTEGER,
+    name TEXT,
+    outcome TEXT NOT NULL,
+    code INTEGER,
+    duration REAL,
+    utime REAL,
+    stime REAL,
+    maxrss INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+CREATE INDEX IF NOT EXISTS results_test ON results (test, run);
+CREATE INDEX IF NOT EXISTS results_run ON results (run, outcome);
+'''
+
+def _open_history(path):
+    import sqlite3
+
+    db = sqlite3.connect(path)
+    db.executescript(HISTORY_SCHEMA)
+
+    return db
+
+def history(argv):
+    # Answers questions about past runs recorded with --history
+    import argparse
+
+    parser = argparse.ArgumentParser("pyra.py history")
+    parser.add_argument('--db', dest='db', default=os.path.join(default_config()['resultsDir'], TestRunner.HISTORY_FILE), help='The history database.')
+    parser.add_argument('--runs', dest='runs', type=int, default=20, help='How many of the latest runs to look at.')
+    parser.add_argument('--days', dest='days', type=float, default=None, help='Only look at runs from the last DAYS days.')
+    parser.add_argument('--limit', dest='limit', type=int, default=10, help='How many tests to list.')
+    parser.add_argument('--jump', dest='jump', type=float, default=20, metavar='PERCENT', help='Mark runs at least this much slower than the median of the five before.')
+    parser.add_argument('query', choices=['slowest', 'trend', 'failures'], help='slowest: tests by mean duration; trend: one test\'s durations run by run; failures: tests by how often they failed.')
+    parser.add_argument('test', nargs='?', default=None, help='For trend, the test\'s name or number.')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        sys.stderr.write("No history in {}; run tests with --history first.\n".format(args.db))
+        sys.exit(1)
+
+    db = _open_history(args.db)
+
+    # The runs looked at, newest first
+    since = time.time() - args.days * 86400 if args.days is not None else 0
+    runs = [run for run, in db.execute("SELECT id FROM runs WHERE started >= ? ORDER BY id DESC LIMIT ?", (since, args.runs))]
+    if not runs:
+        print("No runs recorded in that time.")
+        sys.exit(0)
+
+    inRuns = "run IN ({})".format(','.join('?' * len(runs)))
+
+    if args.query == 'slowest':
+        print("{:>6} {:>10} {:>10} {:>5}  {}".format('Test', 'Mean', 'Max', 'Runs', 'Name'))
+        for number, name, test, mean, longest, count in db.execute(
+                "SELECT number, name, test, AVG(duration), MAX(duration), COUNT(*) FROM results WHERE " + inRuns +
+                " AND outcome NOT IN ('timeout', 'killed') GROUP BY test, number ORDER BY AVG(duration) DESC LIMIT ?", runs + [args.limit]):
+            print("{:>6} {:>8.1f}ms {:>8.1f}ms {:>5}  {}".format(number, mean * 1000, longest * 1000, count, name or test))
+
+    elif args.query == 'failures':
+        print("{:>6} {:>8} {:>7}  {}".format('Test', 'Failed', 'Flaky', 'Name'))
+        for number, name, test, failed, flaky, count in db.execute(
+                "SELECT number, name, test, SUM(outcome NOT IN ('passed', 'flaky')), SUM(outcome = 'flaky'), COUNT(*) FROM results WHERE " + inRuns +
+                " GROUP BY test, number HAVING SUM(outcome != 'passed') > 0 ORDER BY 4 DESC, 5 DESC LIMIT ?", runs + [args.limit]):
+            print("{:>6} {:>4}/{:<3} {:>7}  {}".format(number, failed, count, flaky, name or test))
+
+    else:
+        if args.test is None:
+            parser.error("trend needs a test name or number")
+
+        # Tests are identified by their spec line, found here from the latest run's number or name
+        column = 'number' if args.test.isdigit() else 'name'
+        match = db.execute("SELECT test FROM results WHERE {} = ? ORDER BY run DESC LIMIT 1".format(column), (args.test,)).fetchone()
+        if match is None:
+            sys.stderr.write("No test {} in the history.\n".format(args.test))
+            sys.exit(1)
+
+        rows = list(db.execute("SELECT started, outcome, duration FROM results JOIN runs ON runs.id = results.run "
+                               "WHERE test = ? AND " + inRuns + " ORDER BY run", [match[0]] + runs))
+
+        print(match[0])
+        previous = []
+        for started, outcome, duration in rows:
+            baseline = sorted(previous[-5:])[len(previous[-5:]) // 2] if previous else None
+            change = (duration / baseline - 1) * 100 if baseline else 0
+            marker = colored("  {:+.0f}%".format(change), 'red') if change >= args.jump else ''
+
+            print("{}  {:<8} {:>9.1f}ms{}".format(time.strftime('%Y-%m-%d %H:%M', time.localtime(started)), outcome, duration * 1000, marker))
+            if outcome not in ('timeout', 'killed'):
+                previous.append(duration)
+
+    db.close()
+    sys.exit(0)
+
+def _gcov_intermediate(fd):
+    # Parses gcov's older intermediate text format into (source, executed lines, executed functions) per source
+    path, lines, functions, spans = None, [], {}, {}
+
+    for line in fd:
+        kind, _, value = line.rstrip('\n').partition(':')
+
+        if kind == 'file':
+            if path is not None:
+                yield path, lines, functions
+            path, lines, functions = value, [], {}
+        elif kind == 'function':
+            fields = value.split(',')
+            # start,count,name before GCC 8; start,end,count,name from it
+            if len(fields) == 3:
+                start, count, name = fields
+                end = start
+            else:
+                start, end, count, name = fields[:4]
+            if int(count):
+                functions[name] = (int(start), int(end))
+        elif kind == 'lcount':
+            fields = value.split(',')
+            if int(fields[1]):
+                lines.append(int(fields[0]))
+
+    if path is not None:
+        yield path, lines, functions
+
+def _diff_ranges(diff):
+    # Changed line ranges on the old side of a --unified=0 diff, by file; insertions mark the lines either side
+    import re
+
+    changes = {}
+    path = None
+
+    for line in diff.splitlines():
+        if line.startswith('--- '):
+            path = line[6:] if line.startswith('--- a/') else None
+        elif line.startswith('+++ ') and path is None:
+            # New files have no old side; they count as changed throughout
+            path = line[6:] if line.startswith('+++ b/') else None
+            if path is not None:
+                changes.setdefault(path, []).append((0, float('inf')))
+        elif line.startswith('@@') and path is not None:
+            match = re.match(r'@@ -(\d+)(?:,(\d+))? ', line)
+            start, count = int(match.group(1)), int(match.group(2) or 1)
+            changes.setdefault(path, []).append((start, start + count - 1) if count else (start, start + 1))
+
+    return changes
+
+def _exit_code(status):
+    # As Popen.returncode: the exit status, or minus the signal that killed the process
+    return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+class _SpawnedProcess(object):
+    # The parts of Popen's interface the runner uses, for processes started with os.posix_spawn
+
+    def __init__(self, pid, args):
+        self.pid = pid
+        self.args = args
+        self.returncode = None
+
+    def kill(self):
+        os.kill(self.pid, signal.SIGKILL)
+
+    def wait(self):
+        if self.returncode is None:
+            self.returncode = _exit_code(os.waitpid(self.pid, 0)[1])
+        return self.returncode
+
+class _ForkServer(object):
+    # A copy of the runner, forked before it grows, which launches tests on its behalf over a Unix socket
+
+    def __init__(self, runner):
+        import socket, tempfile
+
+        self._dir = tempfile.mkdtemp(prefix='pyra-spawn-')
+        self._path = os.path.join(self._dir, 'spawn.sock')
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self._path)
+        listener.listen(64)
+
+        parent = os.getpid()
+        self._pid = os.fork()
+
+        if self._pid == 0:
+            try:
+                self._serve(runner, listener, parent)
+            finally:
+                os._exit(0)
+
+        listener.close()
+
+        import atexit
+        atexit.register(self.close)
+
+    def _serve(self, runner, listener, parent):
+        # Ctrl-C is the parent's to handle
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        listener.settimeout(1)
+
+        while os.getppid() == parent:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                continue
+
+            conn.settimeout(None)
+            threading.Thread(target=self._handle, args=(runner, conn), daemon=True).start()
+
+    def _handle(self, runner, conn):
+        import json
+
+        with conn, conn.makefile('rwb') as stream:
+            request = json.loads(stream.readline().decode())
+            result = runner._launch(request['plan'], request['cgroup'], timeout=request['timeout'])
+            stream.write((json.dumps(result) + '\n').encode())
+
+    def launch(self, plan, cgroup, timeout=None):
+        import json, socket
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(self._path)
+
+            with conn.makefile('rwb') as stream:
+                keys = ['argv', 'exec_sh', 'supplied_in', 'actual_out', 'actual_err', 'cwd']
+                request = {'plan': dict((key, plan.get(key)) for key in keys), 'cgroup': cgroup, 'timeout': timeout}
+                stream.write((json.dumps(request) + '\n').encode())
+                stream.flush()
+
+                return json.loads(stream.readline().decode())
+
+    def close(self):
+        if self._pid:
+            import shutil
+
+            os.kill(self._pid, signal.SIGTERM)
+            os.waitpid(self._pid, 0)
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._pid = None
+
+def bench_spawn(argv):
+    # Shows how spawn latency changes with the runner's size, for each way of spawning
+    import argparse
+
+    parser = argparse.ArgumentParser("pyra.py bench-spawn")
+    parser.add_argument('--sizes', dest='sizes', default='0,256,1024', help='Memory to grow the runner by, in megabytes.')
+    parser.add_argument('-n', dest='count', type=int, default=200, help='Processes to spawn per measurement.')
+    args = parser.parse_args(argv)
+
+    config = {'execDir': os.getcwd(), 'resultsDir': os.devnull, 'timeout': 10}
+    plan = {'argv': ['/bin/true'], 'exec_sh': '/bin/true', 'supplied_in': os.devnull, 'actual_out': os.devnull, 'actual_err': os.devnull}
+
+    # All created up front, so the fork server is forked from a small process
+    runners = [(spawn, TestRunner('', dict(config, spawn=spawn))) for spawn in TestRunner.SPAWNERS]
+
+    print("{:>10}  {}".format('MB', '  '.join('{:>12}'.format(spawn) for spawn, _ in runners)))
+
+    ballast = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        # Touched, so it's really mapped and has to be copied on fork
+        ballast.append(bytearray(size * 1024 * 1024 - sum(len(chunk) for chunk in ballast)))
+        for offset in range(0, len(ballast[-1]), 4096):
+            ballast[-1][offset] = 1
+
+        latencies = []
+        for spawn, runner in runners:
+            start = time.perf_counter()
+            for _ in range(args.count):
+                runner._execute(plan, 0)
+            latencies.append((time.perf_counter() - start) / args.count)
+
+        print("{:>10}  {}".format(size, '  '.join('{:>10.3f}ms'.format(latency * 1000) for latency in latencies)))
+
+class _JsonLineWriter(object):
+    # A text stream sending each complete line to a client as {"line": ...}
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self._partial = ''
+
+    def write(self, text):
+        import json
+
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+
+        for line in lines:
+            self._wfile.write((json.dumps({'line': line}) + '\n').encode())
+        self._wfile.flush()
+
+    def flush(self):
+        pass
+
+def client(argv):
+    # Asks a `pyra.py serve` process to run tests, printing its output as it arrives
+    import argparse, json, socket
+
+    parser = argparse.ArgumentParser("pyra.py client")
+    parser.add_argument('-d', dest='details', action='store_const', default=False, const=True, help='Show detailed output for each test.')
+    parser.add_argument('--socket', dest='socket', default=DEFAULT_SOCKET, help='The socket the server is listening on.')
+    parser.add_argument('tests', type=int, nargs='*', help='The specific tests to run.')
+    args = parser.parse_args(argv)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(args.socket)
+    except OSError as e:
+        sys.stderr.write("No pyra server on {} ({}); start one with `pyra.py serve`.\n".format(args.socket, e.strerror))
+        sys.exit(2)
+
+    request = {'tests': args.tests or None, 'details': args.details, 'color': sys.stdout.isatty()}
+    sock.sendall((json.dumps(request) + '\n').encode())
+
+    passed = False
+    for line in sock.makefile('rb'):
+        message = json.loads(line.decode())
+        if 'line' in message:
+            print(message['line'], flush=True)
+        else:
+            passed = all(message['results'].values())
+
+    sys.exit(0 if passed else 1)
+
+# Asset bundles: a header, an open-addressed hash table of entries, their names, then each distinct content once
+#
+#   header: magic, entry count, table slots, digest of the contents
+#   slot:   name hash, data offset, data length, name offset, name length, mode (an empty slot has no name)
+BUNDLE_MAGIC = b'PYRAPAK1'
+BUNDLE_HEADER = '<8sII16s'
+BUNDLE_SLOT = '<QQQIII'
+
+def _bundle_hash(name):
+    import hashlib
+    return int.from_bytes(hashlib.blake2b(name, digest_size=8).digest(), 'little')
+
+class _Bundle(object):
+    # A packed assets directory, looked up by path relative to it without reading more than the slots probed
+
+    def __init__(self, path):
+        import mmap, struct
+
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        if os.fstat(self._fd).st_size < struct.calcsize(BUNDLE_HEADER):
+            os.close(self._fd)
+            raise ValueError("{} isn't an asset bundle".format(path))
+
+        self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, self.count, self._slots, digest = struct.unpack_from(BUNDLE_HEADER, self._map)
+        if magic != BUNDLE_MAGIC:
+            self._view.release()
+            self._map.close()
+            os.close(self._fd)
+            raise ValueError("{} isn't an asset bundle".format(path))
+
+        self.digest = digest.hex()
+        self._slot = struct.Struct(BUNDLE_SLOT)
+        self._table = struct.calcsize(BUNDLE_HEADER)
+
+    def fileno(self):
+        return self._fd
+
+    def entry(self, name):
+        # (offset, length, mode) of the named file, or None
+        name = name.encode()
+        key = _bundle_hash(name)
+        slot = key & (self._slots - 1)
+
+        while True:
+            hashed, offset, length, nameOffset, nameLength, mode = self._slot.unpack_from(self._map, self._table + slot * self._slot.size)
+            if not nameLength:
+                return None
+            if hashed == key and self._map[nameOffset:nameOffset + nameLength] == name:
+                return offset, length, mode
+            slot = (slot + 1) & (self._slots - 1)
+
+    def read(self, name):
+        # The named file's contents as a view of the mapping, or None
+        entry = self.entry(name)
+        return None if entry is None else self._view[entry[0]:entry[0] + entry[1]]
+
+    def extract(self, name, directory):
+        # Writes the named file under directory once, keeping its mode, and returns its path
+        offset, length, mode = self.entry(name)
+        path = os.path.join(directory, name)
+
+        try:
+            if os.stat(path).st_size == length:
+                return path
+        except OSError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Written aside and renamed in, so parallel tests never run a partial file
+        temp = '{}.{}.{}'.format(path, os.getpid(), threading.get_ident())
+        with open(temp, 'wb') as fd:
+            fd.write(self._view[offset:offset + length])
+        os.chmod(temp, mode & 0o7777)
+        os.replace(temp, path)
+
+        return path
+
+def pack(argv):
+    # Packs an assets directory into a single bundle for --bundle
+    import argparse, hashlib, struct
+
+    parser = argparse.ArgumentParser("pyra.py pack")
+    parser.add_argument('-o', dest='output', default=None, help='Where to write the bundle (default: the directory\'s name with .pack).')
+    parser.add_argument('directory', nargs='?', default=default_config()['assetsDir'], help='The assets directory (default: assets beside pyra).')
+    args = parser.parse_args(argv)
+
+    directory = os.path.normpath(args.directory)
+    output = args.output or directory + '.pack'
+
+    files = []
+    for root, subdirs, names in os.walk(directory):
+        subdirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, directory).replace(os.sep, '/').encode(), path))
+
+    # Half full at most, so probes stay short
+    slots = 1
+    while slots < 2 * len(files):
+        slots *= 2
+
+    table = struct.calcsize(BUNDLE_HEADER)
+    names = table + slots * struct.calcsize(BUNDLE_SLOT)
+    dataStart = names + sum(len(name) for name, _ in files)
+
+    entries = [None] * slots
+    contents = []
+    offsets = {}
+    nameOffset, dataOffset = names, dataStart
+    digest = hashlib.blake2b(digest_size=16)
+
+    for name, path in files:
+        with open(path, 'rb') as fd:
+            data = fd.read()
+
+        # Identical files share one copy
+        key = hashlib.sha256(data).digest()
+        if key not in offsets:
+            offsets[key] = dataOffset
+            contents.append(data)
+            dataOffset += len(data)
+
+        mode = os.stat(path).st_mode
+
+        # Extracted files are found by name and reused as they are, so the digest covers each file's name,
+        # contents and mode
+        digest.update(name + b'\0' + key + struct.pack('<I', mode))
+
+        hashed = _bundle_hash(name)
+        slot = hashed & (slots - 1)
+        while entries[slot] is not None:
+            slot = (slot + 1) & (slots - 1)
+        entries[slot] = (hashed, offsets[key], len(data), nameOffset, len(name), mode)
+        nameOffset += len(name)
+
+    with open(output + '.tmp', 'wb') as fd:
+        fd.write(struct.pack(BUNDLE_HEADER, BUNDLE_MAGIC, len(files), slots, digest.digest()))
+        empty = struct.pack(BUNDLE_SLOT, 0, 0, 0, 0, 0, 0)
+        fd.write(b''.join(struct.pack(BUNDLE_SLOT, *entry) if entry else empty for entry in entries))
+        fd.write(b''.join(name for name, _ in files))
+        fd.write(b''.join(contents))
+    os.replace(output + '.tmp', output)
+
+    print("Packed {} files ({} distinct, {} bytes) from {} into {}".format(len(files), len(contents), dataOffset - dataStart, directory, output))
+    sys.exit(0)
+
+def _start_player(mode, command, **options):
+    # Starts the player a shim stands in for, exiting as a shell would if it can't be run
+    try:
+        return subprocess.Popen(command, **options)
+    except OSError as e:
+        # Like execvp, which hubs typically use, run scripts lacking a #! line with the shell
+        if e.errno != errno.ENOEXEC:
+            sys.stderr.write("{}: cannot run {}: {}\n".format(mode, command[0], e.strerror))
+            sys.exit(127)
+        return subprocess.Popen(['/bin/sh'] + command, **options)
+
+def _exit_as(code):
+    # Exits the way the player did, so the hub sees the same status
+    if code < 0:
+        signal.signal(-code, signal.SIG_DFL)
+        os.kill(os.getpid(), -code)
+
+    sys.exit(code)
+
+def relay(argv):
+    # Runs a player, passing its output on in small random chunks with small random delays in between
+    import argparse, random
+
+    parser = argparse.ArgumentParser("pyra.py relay")
+    parser.add_argument('--max-chunk', dest='maxChunk', type=int, default=4)
+    parser.add_argument('--max-delay', dest='maxDelay', type=float, default=0.002)
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+
+    proc = _start_player('relay', command, stdout=subprocess.PIPE)
+
+    rng = random.Random()
+
+    try:
+        while True:
+            data = os.read(proc.stdout.fileno(), 4096)
+            if not data:
+                break
+
+            while data:
+                size = rng.randint(1, args.maxChunk)
+                os.write(1, data[:size])
+                data = data[size:]
+                time.sleep(rng.uniform(0, args.maxDelay))
+    except BrokenPipeError:
+        pass
+
+    proc.stdout.close()
+    _exit_as(proc.wait())
+
+# Exit status of a replayed player whose hub didn't send what was recorded
+REPLAY_DIVERGED = 99
+
+def record(argv):
+    # Runs a player, saving everything it's sent and sends as a transcript `pyra.py replay` can stand in with
+    import argparse, json
+
+    parser = argparse.ArgumentParser("pyra.py record")
+    parser.add_argument('--transcript', dest='transcript', required=True)
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+
+    proc = _start_player('record', command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    # Messages are logged as they're passed on and output as soon as it's read, so the order of events
+    # in the transcript is one in which the player could have seen them
+    events = []
+    lock = threading.Lock()
+
+    def forward():
+        # stdin is read from the descriptor rather than sys.stdin, whose lock this thread would still hold when the
+        # player exits first and the interpreter shuts down under it
+        pending = b''
+        try:
+            while True:
+                data = os.read(0, 4096)
+                pending += data
+
+                # Messages are passed on a whole line at a time, and whatever's left once stdin closes after them
+                end = pending.rfind(b'\n') + 1 if data else len(pending)
+                lines, pending = io.BytesIO(pending[:end]), pending[end:]
+
+                with lock:
+                    for line in lines:
+                        proc.stdin.write(line)
+                        events.append(['in', line.decode('latin-1')])
+                    proc.stdin.flush()
+
+                if not data:
+                    break
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    forwarder = threading.Thread(target=forward)
+    forwarder.daemon = True
+    forwarder.start()
+
+    try:
+        while True:
+            data = os.read(proc.stdout.fileno(), 4096)
+            if not data:
+                break
+
+            with lock:
+                events.append(['out', data.decode('latin-1')])
+            os.write(1, data)
+    except BrokenPipeError:
+        pass
+
+    proc.stdout.close()
+    code = proc.wait()
+
+    with lock:
+        transcript = {'args': command[1:], 'events': events, 'code': code}
+
+    with open(args.transcript + '.tmp', 'w') as fd:
+        json.dump(transcript, fd)
+    os.replace(args.transcript + '.tmp', args.transcript)
+
+    _exit_as(code)
+
+def replay(argv):
+    # Stands in for a recorded player, answering the hub from its transcript without running it
+    import argparse, json
+
+    parser = argparse.ArgumentParser("pyra.py replay")
+    parser.add_argument('--transcript', dest='transcript', required=True)
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+
+    with open(args.transcript) as fd:
+        transcript = json.load(fd)
+
+    def diverged(message):
+        sys.stderr.write("replay: {}: {} in {}\n".format(command[0] if command else 'player', message, args.transcript))
+        sys.exit(REPLAY_DIVERGED)
+
+    if command[1:] != transcript['args']:
+        diverged("started with arguments {} but {} were recorded".format(command[1:], transcript['args']))
+
+    # Messages from the hub are counted on their own, so divergence names the hub's message
+    received = 0
+
+    try:
+        for kind, data in transcript['events']:
+            if kind == 'out':
+                os.write(1, data.encode('latin-1'))
+                continue
+
+            received += 1
+            line = sys.stdin.buffer.readline().decode('latin-1')
+            if line != data:
+                diverged("message {} from the hub was {!r} but {!r} was recorded".format(received, line, data))
+    except BrokenPipeError:
+        pass
+
+    _exit_as(transcript['code'])
+
+def default_config(execDir=None):
+    # Where things are when running from execDir (by default the current directory), as pyra.py does
+    execDir = os.path.normpath(execDir or os.getcwd())
+
+    return {
+        'execDir': execDir,
+        'resultsDir': os.path.join(execDir, 'testres'),
+        'assetsDir': os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets/'))
+    }
+
+def main(tests, argv=None, started=None):
+    # The command line: runs tests from a TESTS spec, or one of the subcommands
+    argv = sys.argv[1:] if argv is None else list(argv)
+    started = started or STARTED
+
+    config = default_config()
+
+    if argv[:1] == ['relay']:
+        relay(argv[1:])
+    if argv[:1] == ['client']:
+        client(argv[1:])
+    if argv[:1] == ['record']:
+        record(argv[1:])
+    if argv[:1] == ['replay']:
+        replay(argv[1:])
+    if argv[:1] == ['history']:
+        history(argv[1:])
+    if argv[:1] == ['pack']:
+        pack(argv[1:])
+    if argv[:1] == ['bench-spawn']:
+        bench_spawn(argv[1:])
+        sys.exit(0)
+
+    command = argv[0] if argv[:1] in (['serve'], ['reduce'], ['fuzz'], ['tournament']) else None
+    argv = argv[1:] if command else argv
+
+    import argparse
+
+    parser = argparse.ArgumentParser("pyra.py " + command if command else "Run tests.")
+    parser.add_argument('-d', dest='details', action='store_const', default=False, const=True, help='Show detailed output for each test.')
+    parser.add_argument('-t', dest='timeout', type=float, default=5, help='Set the time limit, in seconds, for each test to run.')
+    parser.add_argument('--color', dest='color', choices=['auto', 'always', 'never'], default='auto', help='Colour the output; by default only when writing to a terminal.')
+    parser.add_argument('--startup-time', dest='startupTime', action='store_const', default=False, const=True, help='Report how long pyra took to start, against its budget.')
+    parser.add_argument('--compare', dest='compare', choices=sorted(COMPARATORS), default='text', help='How outputs are compared for tests that don\'t specify it.')
+    parser.add_argument('--full-path', dest='fullPath', action='store_const', default=False, const=True, help='Use the full path for all files.')
+    parser.add_argument('--limit-as', dest='limitAs', type=int, default=None, metavar='MB', help='Limit the address space of each test process (and the memory of its cgroup), in megabytes.')
+    parser.add_argument('--limit-cpu', dest='limitCpu', type=int, default=None, metavar='SECONDS', help='Limit the CPU time of each test.')
+    parser.add_argument('--limit-nproc', dest='limitNproc', type=int, default=None, metavar='N', help='Limit the number of processes (per user for rlimits, per test with --cgroup).')
+    parser.add_argument('--limit-nofile', dest='limitNofile', type=int, default=None, metavar='N', help='Limit the number of open files of each test process.')
+    parser.add_argument('--cgroup', dest='cgroup', action='store_const', default=None, const='auto', help='Run each test in its own cgroup v2 group beneath the current cgroup.')
+    parser.add_argument('--cgroup-root', dest='cgroup', metavar='PATH', help='Like --cgroup, but beneath PATH.')
+    parser.add_argument('--spawn', dest='spawn', choices=TestRunner.SPAWNERS, default='popen', help='How to start test processes; posix_spawn and forkserver keep spawning fast in a large runner.')
+    parser.add_argument('--capture', dest='capture', choices=TestRunner.CAPTURES, default='file', help='Capture output through pipes into memory, writing it to the results directory only for failing tests.')
+    parser.add_argument('--record', dest='record', metavar='DIR', help='Record what each hub test\'s players are sent and send into transcripts in DIR.')
+    parser.add_argument('--replay', dest='replay', metavar='DIR', help='Replace players in hub tests with replays of their transcripts in DIR.')
+    parser.add_argument('--profile', dest='profile', action='store_const', default=False, const=True, help='Report where pyra\'s own time goes, by phase and test.')
+    parser.add_argument('--profile-stats', dest='profile', metavar='FILE', help='Like --profile, also saving cProfile stats in FILE.')
+    parser.add_argument('--adaptive-timeout', dest='adaptiveTimeout', action='store_const', default=False, const=True, help='Time tests out at a multiple of their slowest recent runs, once they have a history.')
+    parser.add_argument('--timeout-multiplier', dest='timeoutMultiplier', type=float, default=5, metavar='X', help='Adaptive timeouts are X times a test\'s 99th percentile duration.')
+    parser.add_argument('--timeout-floor', dest='timeoutFloor', type=float, default=0.1, metavar='SECONDS', help='Shortest adaptive timeout.')
+    parser.add_argument('--timeout-ceiling', dest='timeoutCeiling', type=float, default=None, metavar='SECONDS', help='Longest adaptive timeout (default: -t).')
+    parser.add_argument('--isolate', dest='isolate', action='store_const', default=False, const=True, help='Run each test in a private working directory of links to the exec dir, so parallel tests can\'t collide.')
+    parser.add_argument('--history', dest='history', action='store_const', default=None, const=True, help='Add each run\'s results to history.sqlite in the results directory, for `pyra.py history`.')
+    parser.add_argument('--history-db', dest='history', metavar='DB', help='Like --history, but to the SQLite database DB.')
+    parser.add_argument('--bundle', dest='bundle', action='store_const', default=None, const=True, help='Read assets from assets.pack beside the assets directory, made by `pyra.py pack`, falling back to the directory.')
+    parser.add_argument('--bundle-file', dest='bundle', metavar='PACK', help='Like --bundle, but from PACK.')
+    parser.add_argument('--bundle-cache', dest='bundleCache', metavar='DIR', help='Where programs and files from the bundle are extracted to (default: ~/.cache/pyra).')
+    parser.add_argument('--impact-build', dest='impactBuild', action='store_const', default=False, const=True, help='Run tests against gcov-instrumented builds, mapping each to the C source it covers.')
+    parser.add_argument('--impact', dest='impact', action='store_const', default=False, const=True, help='Only run tests covering C source changed (per git diff) since the map was built.')
+    parser.add_argument('-j', dest='jobs', type=int, default=1, help='Run up to this many tests in parallel.')
+    parser.add_argument('--rerun-failures', dest='rerunFailures', type=int, default=0, metavar='K', help='Re-run failing tests up to K times to tell flaky tests from broken ones.')
+    parser.add_argument('--stress', dest='stress', type=int, default=0, metavar='N', help='Run N copies of each test at once, fragmenting player output to the hub, and report nondeterministic output.')
+    parser.add_argument('--stress-cpus', dest='cpus', type=lambda cpus: set(int(cpu) for cpu in cpus.split(',')), default=None, metavar='LIST', help='Pin tests (and hogs) to these CPUs, e.g. 0,1.')
+    parser.add_argument('--stress-hogs', dest='stressHogs', type=int, default=0, metavar='N', help='Run N busy loops alongside the tests under stress.')
+    parser.add_argument('--stress-chunk', dest='stressChunk', type=int, default=4, metavar='BYTES', help='Largest chunk of player output passed on at once under stress.')
+    parser.add_argument('--stress-delay', dest='stressDelay', type=float, default=0.002, metavar='SECONDS', help='Longest delay between chunks of player output under stress.')
+    parser.add_argument('--watch', dest='watch', action='store_const', default=False, const=True, help='Keep running, re-running tests whose executable or assets change.')
+    parser.add_argument('--watch-interval', dest='watchInterval', type=float, default=0.5, metavar='SECONDS', help='How often to poll for changes in watch mode.')
+
+    if command == 'serve':
+        parser.add_argument('--socket', dest='socket', default=DEFAULT_SOCKET, help='The socket to listen on.')
+    elif command == 'reduce':
+        parser.add_argument('--output', dest='output', default=None, metavar='DIR', help='Where to write the reduced test\'s files (default: resultsDir/reduced/test.N).')
+        parser.add_argument('tests', type=int, help="The failing test to reduce.")
+    elif command == 'fuzz':
+        parser.add_argument('--program', dest='program', default='./player', help='The program to fuzz; tests running it with input are the seeds.')
+        parser.add_argument('--runs', dest='runs', type=int, default=1000, help='How many mutated inputs to run.')
+        parser.add_argument('--seed', dest='seed', type=int, default=None, help='Seed for the mutations, to repeat a run.')
+        parser.add_argument('--output', dest='output', default=None, metavar='DIR', help='Where to write reproducers (default: resultsDir/fuzz).')
+        # Hangs are found by timing out, so the default is shorter than for tests
+        parser.set_defaults(timeout=1)
+    elif command == 'tournament':
+        parser.add_argument('--hub', dest='hub', default='./hub', help='The hub to play games with.')
+        parser.add_argument('--decks', dest='decks', action='append', default=[], metavar='DECK', help='A deck to play every seating on; give it once for each deck.')
+        parser.add_argument('--random', dest='randomDecks', type=int, default=0, metavar='N', help='Also play on N randomly shuffled decks.')
+        parser.add_argument('--rounds', dest='rounds', type=int, default=12, help='Rounds in each random deck.')
+        parser.add_argument('--seats', dest='seats', type=int, default=2, help='Players in each game.')
+        parser.add_argument('--seed', dest='seed', type=int, default=None, help='Seed for the random decks.')
+        parser.add_argument('players', nargs='+', help='Player programs to compare; ./pyra/pyra_player.py is a reference player to compare against.')
+    else:
+        parser.add_argument('tests', type=int, nargs='?', default=None, help="The specific test to run.")
+
+    args = vars(parser.parse_args(argv))
+    config.update(args)
+
+    if config['limitAs'] is not None:
+        config['limitAs'] *= 1024 * 1024
+
+    indices = None if config.get('tests') is None else [config['tests']]
+
+    if config['color'] != 'auto':
+        use_color(config['color'] == 'always')
+
+    runner = TestRunner(tests, config)
+
+    if config['startupTime']:
+        startup = time.perf_counter() - started
+        print(colored("Started in {:.1f}ms (budget {:.0f}ms)".format(startup * 1000, STARTUP_BUDGET * 1000),
+                      'green' if startup <= STARTUP_BUDGET else 'red'))
+
+    # cProfile only sees the main thread, so with -j it shows scheduling rather than the tests' own phases
+    profiler = None
+    if isinstance(config['profile'], str):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        if command == 'serve':
+            runner.serve(config['socket'])
+        elif command == 'reduce':
+            if not os.path.exists(config['resultsDir']):
+                os.makedirs(config['resultsDir'])
+            sys.exit(0 if runner.reduce(config['tests'], config['output']) else 1)
+        elif command == 'fuzz':
+            sys.exit(1 if runner.fuzz(config['program'], config['runs'], config['seed'], config['output']) else 0)
+        elif command == 'tournament':
+            sys.exit(0 if runner.tournament(config['players'], config['hub'], config['decks'], config['randomDecks'],
+                                            config['rounds'], config['seats'], config['seed']) else 1)
+        elif config['impactBuild']:
+            sys.exit(0 if runner.build_impact(indices) else 1)
+        elif config['stress']:
+            runner.stress(indices=indices, copies=config['stress'])
+        elif config['watch']:
+            runner.watch(indices=indices, interval=config['watchInterval'])
+        else:
+            if config['impact']:
+                indices = runner.impacted(indices)
+            runner.run_tests(indices=indices)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(config['profile'])
+
+if __name__ == '__main__':
+    # Subcommands work without a spec; tests are run through pyra.py
+    main('')
@@ -0,0 +1,95 @@
+# A pytest plugin collecting the rows of a pyra.py's TESTS as pytest items, one per row.
+#
+# Enable it with the pyra directory on the path, from the directory the tests run in:
+#
+#   PYTHONPATH=pyra python -m pytest -p pytest_pyra pyra/pyra.py
+#
+# Items are named test_N[name] after their row, so -k, -x, --lf and the rest work as usual, and
+# pytest-xdist's -n spreads them over processes, each with a runner (and spawn backend) of its own.
+
+import io, os
+
+import pytest
+
+import pyralib
+
+def pytest_addoption(parser):
+    group = parser.getgroup('pyra')
+    group.addoption('--pyra-exec-dir', dest='pyraExecDir', default=None, help='Where tests run (default: the current directory).')
+    group.addoption('--pyra-results-dir', dest='pyraResultsDir', default=None, help='Where test output is written (default: testres in the exec dir).')
+    group.addoption('--pyra-timeout', dest='pyraTimeout', type=float, default=5, help='Time limit, in seconds, for each test.')
+    group.addoption('--pyra-compare', dest='pyraCompare', choices=sorted(pyralib.COMPARATORS), default='text', help='How outputs are compared for rows that don\'t specify it.')
+    group.addoption('--pyra-spawn', dest='pyraSpawn', choices=pyralib.TestRunner.SPAWNERS, default='popen', help='How to start test processes.')
+    group.addoption('--pyra-capture', dest='pyraCapture', choices=pyralib.TestRunner.CAPTURES, default='file', help='How to capture test output.')
+
+def pytest_configure(config):
+    # Failures are reported as plain text, which pytest colours itself
+    pyralib.use_color(False)
+    config._pyraRunners = {}
+
+def pytest_collect_file(file_path, parent):
+    if file_path.name == 'pyra.py':
+        return PyraFile.from_parent(parent, path=file_path)
+
+def _runner(config, path):
+    # One runner per spec per process, so plans and expected output are cached across its items
+    runner = config._pyraRunners.get(path)
+
+    if runner is None:
+        import importlib.util
+
+        # pyra.py only runs tests when it's the main script, so importing it just gives its TESTS
+        spec = importlib.util.spec_from_file_location('pyra_tests', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        options = pyralib.default_config(config.getoption('pyraExecDir'))
+        options.update({
+            'assetsDir': os.path.join(os.path.dirname(path), 'assets'),
+            'timeout': config.getoption('pyraTimeout'),
+            'compare': config.getoption('pyraCompare'),
+            'spawn': config.getoption('pyraSpawn'),
+            'capture': config.getoption('pyraCapture'),
+            'details': True
+        })
+        if config.getoption('pyraResultsDir'):
+            options['resultsDir'] = os.path.abspath(config.getoption('pyraResultsDir'))
+
+        runner = config._pyraRunners[path] = pyralib.TestRunner(module.TESTS, options)
+
+    return runner
+
+class PyraFailure(Exception):
+    pass
+
+class PyraFile(pytest.File):
+
+    def collect(self):
+        runner = _runner(self.config, str(self.path))
+
+        for testNum, test in runner.tests():
+            name = 'test_{}'.format(testNum) + ('[{}]'.format(test['name']) if test['name'] else '')
+            yield PyraItem.from_parent(self, name=name, runner=runner, testNum=testNum)
+
+class PyraItem(pytest.Item):
+
+    def __init__(self, *, runner, testNum, **kwargs):
+        super().__init__(**kwargs)
+        self.runner = runner
+        self.testNum = testNum
+
+    def runtest(self):
+        # What pyra would print with -d, kept for the failure report
+        self.runner.out = io.StringIO()
+
+        if not self.runner.run_test(self.testNum)['success']:
+            raise PyraFailure(self.runner.out.getvalue())
+
+    def repr_failure(self, excinfo):
+        if isinstance(excinfo.value, PyraFailure):
+            return excinfo.value.args[0]
+
+        return super().repr_failure(excinfo)
+
+    def reportinfo(self):
+        return self.path, None, 'pyra test {}'.format(self.testNum)